@@ -1,20 +1,20 @@
-from TexTor.settings import SPACY_MODEL, COREF_MODEL
-import spacy
-import sense2vec
+# spacy and sense2vec take seconds to import, they are only imported when a
+# model is first requested so that lightweight modules (inflect, lexicons)
+# can be used without paying for them. Models are kept in a registry shared
+# by the whole process, see TexTor.registry to preload them before forking.
+from TexTor.registry import models
 
-_nlp = None
-_coref_nlp = None
 
+def get_nlp(model=None):
+    """The spacy pipeline, SPACY_MODEL unless another model is named."""
+    return models.get("spacy", model)
 
-def get_nlp():
-    global _nlp
-    if _nlp is None:
-        _nlp = spacy.load(SPACY_MODEL)
-    return _nlp
 
+def get_corefnlp(model=None):
+    """The coreference pipeline, COREF_MODEL unless another is named."""
+    return models.get("coref", model)
 
-def get_corefnlp():
-    global _coref_nlp
-    if _coref_nlp is None:
-        _coref_nlp = sense2vec.load(COREF_MODEL)
-    return _coref_nlp
+
+def get_tagger(engine=None):
+    """The shared SentenceTagger of an engine, "ngram" by default."""
+    return models.get("tagger", engine)
@@ -0,0 +1,327 @@
+import hashlib
+import inspect
+import os
+import pickle
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """Bounded mapping that evicts the least recently used entry.
+
+    Keeps hit, miss and eviction counters, a maxsize of 0 disables the
+    cache and None makes it unbounded.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        if self.maxsize is None:
+            return
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+#### RESULT CACHE ########################################################
+# Results of expensive calls (NER, coreference, summaries, remote services)
+# keyed by a hash of the function, its model version and all its arguments,
+# so a document seen before is never processed twice. Nothing is cached
+# until configure_cache() is called.
+
+_result_cache = None
+
+
+class ResultCache(object):
+    """Two tier cache of pickled results, an in-memory LRU in front of an
+    optional SQLite file.
+
+    The file is trimmed to max_disk_bytes by dropping the least recently
+    read entries, entries older than ttl seconds are ignored and deleted.
+    The size of the file is summed once when it is opened and then kept up
+    to date by every write, entries written by other processes meanwhile
+    are only counted at the next connection.
+    """
+
+    def __init__(self, path=None, memory_size=1024, max_disk_bytes=None,
+                 ttl=None):
+        self.path = path
+        self.memory = LRUCache(memory_size)
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._lock = Lock()
+        self._db = None
+        self._pid = None
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+
+    def _connect(self):
+        # sqlite connections can not be shared with forked processes
+        if self.path is None:
+            return None
+        if self._db is None or self._pid != os.getpid():
+            import sqlite3
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False,
+                                       isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS results ("
+                             "key TEXT PRIMARY KEY, value BLOB, "
+                             "size INTEGER, created REAL, accessed REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed "
+                             "ON results (accessed)")
+            self._disk_bytes = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            self._pid = os.getpid()
+        return self._db
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key, default=None):
+        entry = self.memory.get(key)
+        if entry is not None and not self._expired(entry[0]):
+            self.hits += 1
+            return pickle.loads(entry[1])
+        with self._lock:
+            db = self._connect()
+            row = db and db.execute(
+                "SELECT value, created, size FROM results WHERE key = ?",
+                (key,)).fetchone()
+            if row is None or self._expired(row[1]):
+                if row is not None:
+                    db.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._disk_bytes -= row[2]
+                self.misses += 1
+                return default
+            db.execute("UPDATE results SET accessed = ? WHERE key = ?",
+                       (time.time(), key))
+            self.hits += 1
+            self.disk_hits += 1
+        self.memory.put(key, (row[1], row[0]))
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        self.memory.put(key, (now, data))
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            old = db.execute("SELECT size FROM results WHERE key = ?",
+                             (key,)).fetchone()
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                       (key, data, len(data), now, now))
+            self._disk_bytes += len(data) - (old[0] if old else 0)
+            if self.max_disk_bytes is not None and \
+                    self._disk_bytes > self.max_disk_bytes:
+                self._trim(db)
+
+    def _trim(self, db):
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = db.execute("SELECT key, size FROM results "
+                              "ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, row_size in rows:
+                db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._disk_bytes -= row_size
+                self.disk_evictions += 1
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+
+    def purge(self):
+        """Deletes the expired entries of the file, returns how many."""
+        with self._lock:
+            db = self._connect()
+            if db is None or self.ttl is None:
+                return 0
+            oldest = time.time() - self.ttl
+            self._disk_bytes -= db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM results "
+                "WHERE created < ?", (oldest,)).fetchone()[0]
+            return db.execute("DELETE FROM results WHERE created < ?",
+                              (oldest,)).rowcount
+
+    def clear(self):
+        """Drop all entries, in memory and on disk, and reset the counters."""
+        self.memory.clear()
+        with self._lock:
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM results")
+                self._disk_bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
+            self.disk_evictions = 0
+
+    def info(self):
+        lookups = self.hits + self.misses
+        info = {"hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory": self.memory.info()}
+        with self._lock:
+            db = self._connect()
+            if db is not None:
+                entries, size = db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) "
+                    "FROM results").fetchone()
+                info["disk"] = {"hits": self.disk_hits,
+                                "evictions": self.disk_evictions,
+                                "size": entries,
+                                "bytes": size,
+                                "max_bytes": self.max_disk_bytes}
+        return info
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+
+def configure_cache(path=None, memory_size=1024, max_disk_bytes=None,
+                    ttl=None):
+    """Turns on the cache of the @cached functions, in memory only unless
+    a path to an SQLite file is given, and returns it."""
+    global _result_cache
+    if _result_cache is not None:
+        _result_cache.close()
+    _result_cache = ResultCache(path, memory_size, max_disk_bytes, ttl)
+    return _result_cache
+
+
+def disable_cache():
+    global _result_cache
+    if _result_cache is not None:
+        _result_cache.close()
+    _result_cache = None
+
+
+def get_result_cache():
+    """The cache set by configure_cache, or None."""
+    return _result_cache
+
+
+def _plain(value):
+    """Whether value has a stable repr, so it can be part of a key."""
+    if value is None or isinstance(value, (str, bytes, int, float, bool)):
+        return True
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return all(_plain(v) for v in value)
+    if isinstance(value, dict):
+        return all(_plain(k) and _plain(v) for k, v in value.items())
+    return False
+
+
+def _key_repr(value):
+    """repr of a plain value that does not depend on PYTHONHASHSEED or on
+    insertion order, set members and dict items are sorted."""
+    if isinstance(value, (set, frozenset)):
+        return "{%s}" % ", ".join(sorted(map(_key_repr, value)))
+    if isinstance(value, dict):
+        return "{%s}" % ", ".join(sorted(
+            _key_repr(k) + ": " + _key_repr(v) for k, v in value.items()))
+    if isinstance(value, tuple):
+        return "(%s)" % ", ".join(map(_key_repr, value))
+    if isinstance(value, list):
+        return "[%s]" % ", ".join(map(_key_repr, value))
+    return repr(value)
+
+
+def cache_key(function, version, arguments):
+    """sha256 of the function name, the model version and the arguments."""
+    parts = (function.__module__, function.__qualname__, str(version),
+             _key_repr(dict(arguments)))
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def cached(version=None):
+    """Puts the result cache in front of a function. version, a string or
+    a function returning one, names the models the results depend on so
+    that changing them invalidates the entries.
+    Calls are passed through while no cache is configured, or when an
+    argument is not a plain value (a spacy pipeline for instance)."""
+    def decorator(function):
+        signature = inspect.signature(function)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            cache = _result_cache
+            if cache is None:
+                return function(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if not _plain(bound.arguments):
+                return function(*args, **kwargs)
+            key = cache_key(function,
+                            version() if callable(version) else version,
+                            bound.arguments)
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = function(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        return wrapper
+
+    return decorator
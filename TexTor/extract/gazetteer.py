@@ -0,0 +1,253 @@
+"""Dictionary based entity matching with an Aho-Corasick automaton.
+
+Lists of terms (product names, places...) and their labels are compiled
+once into an automaton that finds every term in a single pass over the
+text, whatever the number of terms. Matches are kept only on whole words
+and overlapping ones are resolved leftmost-longest.
+
+The automaton is written to a compact binary file which is memory-mapped
+when loaded, nothing is parsed but a small json header.
+
+Layout, all integers are little endian:
+    magic b"TXGZ", version, length of the metadata (4s, uint32, uint32)
+    metadata, utf-8 json with the labels, whether the terms are case
+    folded and the number of states, edges and terms
+    uint32 arrays, every one starting at a multiple of 8
+        first       states + 1, edges of state s are first[s]:first[s + 1]
+        chars       code point of every edge, sorted within a state
+        targets     state every edge leads to
+        fail        failure link of every state
+        out         id + 1 of the longest term ending at a state, or 0
+        out_link    nearest state on the failure path with a term, or 0
+        lengths     length of every term
+        labels      label id of every term
+
+States are numbered breadth first, the root is state 0.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+MAGIC = b"TXGZ"
+VERSION = 1
+_HEADER = struct.Struct("<4sII")
+_ARRAYS = ("first", "chars", "targets", "fail", "out", "out_link",
+           "lengths", "labels")
+
+
+def _view(buffer, start, count):
+    """A zero-copy view of count little endian uint32 at start."""
+    if sys.byteorder == "little":
+        return memoryview(buffer)[start:start + 4 * count].cast("I")
+    values = array("I", buffer[start:start + 4 * count])
+    values.byteswap()
+    return values
+
+
+def _aligned(position):
+    return (position + 7) & ~7
+
+
+def _fold(text):
+    """Lower cased text, characters whose lower case is longer are kept so
+    that offsets do not move."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def _is_word(c):
+    return c.isalnum() or c == "_"
+
+
+class Gazetteer(object):
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a gazetteer: " + path)
+        meta = json.loads(self._mm[_HEADER.size:_HEADER.size + size]
+                          .decode("utf-8"))
+        self.labels = meta["labels"]
+        self.case_fold = meta["case_fold"]
+        counts = {"first": meta["states"] + 1, "chars": meta["edges"],
+                  "targets": meta["edges"], "fail": meta["states"],
+                  "out": meta["states"], "out_link": meta["states"],
+                  "lengths": meta["terms"], "labels": meta["terms"]}
+        position = _aligned(_HEADER.size + size)
+        self._arrays = []
+        for name in _ARRAYS:
+            self._arrays.append(_view(self._mm, position, counts[name]))
+            position = _aligned(position + 4 * counts[name])
+        (self._first, self._chars, self._targets, self._fail, self._out,
+         self._out_link, self._lengths, self._term_labels) = self._arrays
+        self.size = meta["terms"]
+
+    def _matches(self, text):
+        """(start, end, term id) of every occurrence of every term."""
+        first, chars, targets = self._first, self._chars, self._targets
+        fail, out, out_link = self._fail, self._out, self._out_link
+        lengths = self._lengths
+        matches = []
+        state = 0
+        for i, c in enumerate(_fold(text) if self.case_fold else text):
+            c = ord(c)
+            while True:
+                lo, hi = first[state], first[state + 1]
+                j = bisect_left(chars, c, lo, hi)
+                if j < hi and chars[j] == c:
+                    state = targets[j]
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            found = state if out[state] else out_link[state]
+            while found:
+                term = out[found] - 1
+                matches.append((i + 1 - lengths[term], i + 1, term))
+                found = out_link[found]
+        return matches
+
+    def find(self, text):
+        """(text, label, start, end) of the terms found on whole words,
+        the leftmost and then longest of overlapping ones."""
+        found, last = [], 0
+        for start, end, term in sorted(self._matches(text),
+                                       key=lambda m: (m[0], -m[1])):
+            if start < last:
+                continue
+            if start > 0 and _is_word(text[start - 1]) and \
+                    _is_word(text[start]):
+                continue
+            if end < len(text) and _is_word(text[end]) and \
+                    _is_word(text[end - 1]):
+                continue
+            found.append((text[start:end],
+                          self.labels[self._term_labels[term]], start, end))
+            last = end
+        return found
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        for values in self._arrays:
+            if isinstance(values, memoryview):
+                values.release()
+        self._mm.close()
+
+
+def build_gazetteer(terms, path, case_fold=True):
+    """Compiles (term, label) pairs, or a dict of label -> terms, and writes
+    the automaton to path. The first label of a repeated term is kept.
+    Returns the number of terms."""
+    if isinstance(terms, dict):
+        terms = [(term, label) for label, values in terms.items()
+                 for term in values]
+    labels, label_ids, term_ids = [], {}, {}
+    lengths, term_labels = array("I"), array("I")
+    # trie with dict children, numbered breadth first below
+    children, out = [{}], [0]
+    for term, label in terms:
+        key = _fold(term) if case_fold else term
+        if not key or key in term_ids:
+            continue
+        if label not in label_ids:
+            label_ids[label] = len(labels)
+            labels.append(label)
+        term_ids[key] = len(lengths)
+        lengths.append(len(key))
+        term_labels.append(label_ids[label])
+        state = 0
+        for c in key:
+            nxt = children[state].get(c)
+            if nxt is None:
+                nxt = children[state][c] = len(children)
+                children.append({})
+                out.append(0)
+            state = nxt
+        out[state] = len(lengths)
+
+    order, queue = [], deque([0])
+    while queue:
+        state = queue.popleft()
+        order.append(state)
+        queue.extend(children[state][c] for c in sorted(children[state]))
+    number = {state: i for i, state in enumerate(order)}
+
+    fail = [0] * len(order)
+    out_link = [0] * len(order)
+    for state in order:
+        for c, child in children[state].items():
+            if state:
+                f = fail[state]
+                while f and c not in children[f]:
+                    f = fail[f]
+                fail[child] = children[f].get(c, 0)
+            f = fail[child]
+            out_link[child] = f if out[f] else out_link[f]
+
+    arrays = {name: array("I") for name in _ARRAYS}
+    arrays["lengths"], arrays["labels"] = lengths, term_labels
+    for state in order:
+        arrays["first"].append(len(arrays["chars"]))
+        for c in sorted(children[state]):
+            arrays["chars"].append(ord(c))
+            arrays["targets"].append(number[children[state][c]])
+        arrays["fail"].append(number[fail[state]])
+        arrays["out"].append(out[state])
+        arrays["out_link"].append(number[out_link[state]])
+    arrays["first"].append(len(arrays["chars"]))
+
+    meta = json.dumps({"labels": labels, "case_fold": case_fold,
+                       "states": len(order), "edges": len(arrays["chars"]),
+                       "terms": len(lengths)}).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(meta)))
+        f.write(meta)
+        for name in _ARRAYS:
+            f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            values = arrays[name]
+            if sys.byteorder != "little":
+                values.byteswap()
+            f.write(values.tobytes())
+    os.replace(tmp, path)
+    return len(lengths)
+
+
+def read_terms(path, encoding="utf-8"):
+    """(term, label) pairs of a file with a "term<TAB>label" line each."""
+    with open(path, encoding=encoding) as f:
+        for line in f:
+            term, _, label = line.rstrip("\n").rpartition("\t")
+            if term:
+                yield term, label
+
+
+if __name__ == "__main__":
+    # python -m TexTor.extract.gazetteer terms.tsv [gazetteer.bin]
+    from TexTor.settings import GAZETTEER_PATH
+    if len(sys.argv) > 1:
+        path = sys.argv[2] if len(sys.argv) > 2 else GAZETTEER_PATH
+        print(build_gazetteer(read_terms(sys.argv[1]), path),
+              "terms written to", path)
+    else:
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(), "gazetteer.bin")
+        build_gazetteer({"place": ["New York", "York", "Paris"],
+                         "product": ["Apple Watch", "watch"]}, path)
+        g = Gazetteer(path)
+        assert g.find("I took my apple watch from new york to PARIS.") == [
+            ("apple watch", "product", 10, 21),
+            ("new york", "place", 27, 35),
+            ("PARIS", "place", 39, 44)]
+        assert g.find("Yorkshire watches") == []
@@ -1,92 +1,508 @@
-import nltk
+import atexit
+import os
+import re
+import warnings
+from bisect import bisect_right
+from itertools import islice
+from os import cpu_count
+from threading import Lock
 
-from TexTor.utils import normalize
-from TexTor import get_nlp
+from TexTor import get_nlp, models
+from TexTor.cache import cached
+from TexTor.settings import GAZETTEER_PATH, SPACY_MODEL
+from TexTor.utils import CONTRACTIONS, normalize, normalize_stream
 
 
-def polyglot_NER(blob):
-    """
+def _find_word(text, word, start):
+    """Position of word in text from start, on a word boundary if it can
+    be found on one, -1 if it is not there at all."""
+    first = position = text.find(word, start)
+    while position != -1:
+        before = text[position - 1:position]
+        after = text[position + len(word):position + len(word) + 1]
+        if not (before.isalnum() and word[:1].isalnum()) and \
+                not (after.isalnum() and word[-1:].isalnum()):
+            return position
+        position = text.find(word, position + 1)
+    return first
 
-    Args:
-        blob:
 
-    Returns:
+def align_entities(text, ents):
+    """(start, end, label) in text of entities given by their words, the
+    (text, label) or {"tokens", "label"} output of the engines. Entities
+    are searched in order from the end of the previous one, words that can
+    not be found in text (changed by tokenization) drop the entity."""
+    spans, cursor = [], 0
+    for entity in ents:
+        if isinstance(entity, dict):
+            words, label = entity["tokens"], entity["label"]
+        else:
+            name, label = entity[0], entity[1]
+            words = name.split() if isinstance(name, str) else \
+                [str(word) for word in name]
+        if not words:
+            continue
+        start = _find_word(text, words[0], cursor)
+        if start == -1:  # out of order
+            start = _find_word(text, words[0], 0)
+        end = start + len(words[0])
+        for word in words[1:]:
+            if start == -1:
+                break
+            position = _find_word(text, word, end)
+            end = position + len(word) if position != -1 else -1
+            if position == -1:
+                start = -1
+        if start != -1:
+            spans.append((start, end, label))
+            cursor = end
+    return spans
 
-    """
-    from polyglot.text import Text
 
-    text = Text(blob)
-    ENTS = []
-    for sent in text.sentences:
-        for entity in sent.entities:
-            ENTS.append((entity[0], entity.tag))
+def _processes(n_process):
+    """Number of processes to use, None or <= 0 means all cores."""
+    return n_process if n_process and n_process > 0 else cpu_count() or 1
 
-    return ENTS
 
+class NEREngine(object):
+    """Named entity recognizer, loads its models once when created.
+    Engines are kept for the life of the process by get_engine, subclasses
+    implement __call__ and, when the library can batch, pipe."""
+    name = None
 
-def fox_NER(text):
+    def pipe(self, texts, batch_size=1000, n_process=1):
+        """Lazily yields the entities of every text, in order."""
+        if n_process == 1:
+            for text in texts:
+                yield self(text)
+        else:
+            for ents in _pool_pipe(self.name, texts, batch_size, n_process):
+                yield ents
+
+    def spans(self, text):
+        """(start, end, label) of the entities, character offsets in text.
+        Engines that only return words are aligned with the text."""
+        return align_entities(text, self(text))
+
+
+class PolyglotEngine(NEREngine):
+    name = "polyglot"
+
+    def __init__(self):
+        from polyglot.text import Text
+        self._text = Text
+
+    def __call__(self, blob):
+        text = self._text(blob)
+        ENTS = []
+        for sent in text.sentences:
+            for entity in sent.entities:
+                ENTS.append((entity[0], entity.tag))
+        return ENTS
+
+
+class FoxEngine(NEREngine):
     """
     source https://github.com/dice-group/fox
     demo http://fox-demo.aksw.org/#!/home
+    """
+    name = "fox"
 
-    Args:
-        text:
+    def __init__(self):
+        from foxpy.fox import Fox
+        from foxpy.utils import extractNifPhrases
+        self.fox = Fox()
+        self._phrases = extractNifPhrases
 
-    Returns:
+    def __call__(self, text):
+        json_ld = self.fox.recognizeText(text)
+        nif_phrases = self._phrases(json_ld)
+        if len(nif_phrases) < 1:
+            return text
+
+        nif_phrases = sorted(nif_phrases, key=lambda t: t["endIndex"],
+                             reverse=True)
+        ents = []
+        for n in nif_phrases:
+            name = n["anchorOf"]
+            tag = n["taClassRef"][1].split(":")[1].lower()
+            ents.append((name, tag))
+        return ents
+
+
+class SpacyEngine(NEREngine):
+    name = "spacy"
+
+    def __init__(self, nlp=None):
+        self.nlp = nlp or get_nlp()
+
+    @staticmethod
+    def _ents(doc):
+        return [(entity.text, entity.label_) for entity in doc.ents]
+
+    def __call__(self, text):
+        return self._ents(self.nlp(normalize(text, nlp=self.nlp)))
+
+    def pipe(self, texts, batch_size=1000, n_process=1):
+        # spacy batches and spreads the work over processes itself
+        docs = self.nlp.pipe(normalize_stream(texts, nlp=self.nlp),
+                             batch_size=batch_size,
+                             n_process=_processes(n_process))
+        for doc in docs:
+            yield self._ents(doc)
+
+
+# pipes doc.ents depends on, the others are disabled by SpacyFastEngine
+NER_PIPES = ("tok2vec", "transformer", "entity_ruler", "ner")
+
+
+def _normalize_spans(text):
+    """normalize(text), without coreferences or singularization, and for
+    every word its start in the normalized text, its (start, end) in text
+    and whether it was expanded."""
+    words, spans, position = [], [], 0
+    for match in re.finditer(r"\S+", text):
+        word = CONTRACTIONS.get(match.group().lower(), match.group())
+        words.append(word)
+        spans.append((position, match.start(), match.end(),
+                      word != match.group()))
+        position += len(word) + 1
+    return " ".join(words), spans
+
+
+def _original_offset(spans, starts, offset, end=False):
+    """Offset in the original text of an offset in the normalized one,
+    expanded words map to their whole original word."""
+    start, original, original_end, expanded = \
+        spans[bisect_right(starts, offset - end) - 1]
+    if expanded:
+        return original_end if end else original
+    return original + offset - start
+
+
+class SpacyFastEngine(NEREngine):
+    """spacy entities as (text, label, start_char, end_char), offsets into
+    the original text. Only the components in NER_PIPES run, the shared
+    model is loaded without the others. Texts are not normalized unless
+    normalize_text, entities found in expanded contractions are then
+    widened to the original word."""
+    name = "spacy_fast"
+
+    def __init__(self, nlp=None, normalize_text=False):
+        self.nlp = nlp or models.get("spacy_ner")
+        self.normalize_text = normalize_text
+        self._disable = [name for name in self.nlp.pipe_names
+                         if name not in NER_PIPES]
+
+    def spans(self, text):
+        return [(start, end, label) for _, label, start, end in self(text)]
+
+    def _ents(self, doc, text, spans):
+        if spans is None:
+            return [(entity.text, entity.label_, entity.start_char,
+                     entity.end_char) for entity in doc.ents]
+        starts = [span[0] for span in spans]
+        ents = []
+        for entity in doc.ents:
+            start = _original_offset(spans, starts, entity.start_char)
+            end = _original_offset(spans, starts, entity.end_char, end=True)
+            ents.append((text[start:end], entity.label_, start, end))
+        return ents
+
+    def __call__(self, text):
+        return next(self.pipe([text]))
+
+    def pipe(self, texts, batch_size=1000, n_process=1):
+        if self.normalize_text:
+            texts = ((normalized, (text, spans)) for text in texts
+                     for normalized, spans in [_normalize_spans(text)])
+        else:
+            texts = ((text, (text, None)) for text in texts)
+        docs = self.nlp.pipe(texts, as_tuples=True, batch_size=batch_size,
+                             n_process=_processes(n_process),
+                             disable=self._disable)
+        for doc, (text, spans) in docs:
+            yield self._ents(doc, text, spans)
+
+
+class GazetteerEngine(NEREngine):
+    """Terms of compiled dictionaries, see TexTor.extract.gazetteer."""
+    name = "gazetteer"
+
+    def __init__(self, path=GAZETTEER_PATH):
+        from TexTor.extract.gazetteer import Gazetteer
+        self.gazetteer = Gazetteer(path)
+
+    def __call__(self, text):
+        return [(term, label)
+                for term, label, _, _ in self.gazetteer.find(text)]
+
+    def spans(self, text):
+        return [(start, end, label)
+                for _, label, start, end in self.gazetteer.find(text)]
+
+    def close(self):
+        self.gazetteer.close()
+
+
+class NLTKEngine(NEREngine):
+    name = "nltk"
+
+    def __init__(self):
+        # nltk.pos_tag and nltk.ne_chunk load their model on every call
+        import nltk
+        from nltk.tag import PerceptronTagger
+        self._nltk = nltk
+        self.tagger = PerceptronTagger()
+        try:
+            from nltk.chunk import ne_chunker
+            self.chunker = ne_chunker()
+        except ImportError:  # nltk < 3.9
+            from nltk.chunk import _MULTICLASS_NE_CHUNKER
+            self.chunker = nltk.data.load(_MULTICLASS_NE_CHUNKER)
+
+    def _entities(self, named_Entity):
+        entities = []
+        for x in named_Entity:
+            if isinstance(x, self._nltk.tree.Tree):
+                entities += [{"label": x.label(),
+                              "pos_tag": [e[1] for e in x],
+                              "tokens": [e[0] for e in x]}]
+        return entities
+
+    def __call__(self, paragraph):
+        words = self._nltk.word_tokenize(paragraph)
+        return self._entities(self.chunker.parse(self.tagger.tag(words)))
+
+    def pipe(self, texts, batch_size=1000, n_process=1):
+        if n_process != 1:
+            for ents in NEREngine.pipe(self, texts, batch_size, n_process):
+                yield ents
+            return
+        texts = iter(texts)
+        while True:
+            batch = list(islice(texts, batch_size))
+            if not batch:
+                return
+            tagged = self.tagger.tag_sents(
+                [self._nltk.word_tokenize(text) for text in batch])
+            for tree in self.chunker.parse_sents(tagged):
+                yield self._entities(tree)
 
-    """
 
-    from foxpy.utils import extractNifPhrases
-    f = Fox()
-    json_ld = f.recognizeText(text)
-    nif_phrases = extractNifPhrases(json_ld)
-    if len(nif_phrases) < 1:
-        return text
+ENGINES = {"nltk": NLTKEngine, "spacy": SpacyEngine,
+           "spacy_fast": SpacyFastEngine, "gazetteer": GazetteerEngine,
+           "fox": FoxEngine, "polyglot": PolyglotEngine}
 
-    nif_phrases = sorted(nif_phrases, key=lambda t: t["endIndex"],
-                         reverse=True)
-    ents = []
-    for n in nif_phrases:
-        name = n["anchorOf"]
-        tag = n["taClassRef"][1].split(":")[1].lower()
-        ents.append((name, tag))
-    return ents
 
+def register_engine(name, engine):
+    """Makes an NEREngine subclass, or any callable returning one,
+    available to NER and NER_many under name."""
+    ENGINES[name] = engine
 
+
+def _load_engine(name):
+    if name not in ENGINES:
+        raise ValueError("unknown NER engine: " + name)
+    engine = ENGINES[name]()
+    engine.name = name
+    return engine
+
+
+models.register("ner", _load_engine, "nltk")
+
+
+def get_engine(engine="nltk"):
+    """The engine instance shared by the whole process, created on first
+    use. Unknown engines fall back to nltk, with a warning."""
+    name = engine.lower().strip()
+    if name not in ENGINES:
+        warnings.warn("unknown NER engine %r, using nltk" % (engine,))
+        name = "nltk"
+    return models.get("ner", name)
+
+
+def _models_version():
+    """Models the entities depend on, part of the result cache keys."""
+    gazetteer = os.path.getmtime(GAZETTEER_PATH) \
+        if os.path.exists(GAZETTEER_PATH) else None
+    return "{0} {1}".format(SPACY_MODEL, gazetteer)
+
+
+# Each worker of a NER_many pool creates its engine once.
+_worker_engine = None
+
+
+def _init_worker(name):
+    global _worker_engine
+    _worker_engine = get_engine(name)
+
+
+def _ner_worker(text):
+    return _worker_engine(text)
+
+
+def _pool_pipe(name, texts, batch_size, n_process):
+    """Runs an engine over texts in a pool of processes, batch_size texts
+    in flight at a time so memory does not grow with the input."""
+    from concurrent.futures import ProcessPoolExecutor
+    n_process = _processes(n_process)
+    texts = iter(texts)
+    with ProcessPoolExecutor(n_process, initializer=_init_worker,
+                             initargs=(name,)) as pool:
+        while True:
+            batch = list(islice(texts, batch_size))
+            if not batch:
+                return
+            chunksize = max(1, len(batch) // (n_process * 4))
+            for ents in pool.map(_ner_worker, batch, chunksize=chunksize):
+                yield ents
+
+
+@cached(version=_models_version)
+def polyglot_NER(blob):
+    return get_engine("polyglot")(blob)
+
+
+@cached(version=_models_version)
+def fox_NER(text):
+    return get_engine("fox")(text)
+
+
+@cached(version=_models_version)
 def spacy_NER(text, nlp=None):
-    ents = []
-    nlp = nlp or get_nlp()
-    text = normalize(text, nlp=nlp)
-    doc = nlp(text)
-    for entity in doc.ents:
-        ents.append((entity.text, entity.label_))
+    if nlp is not None:
+        return SpacyEngine(nlp)(text)
+    return get_engine("spacy")(text)
 
-    return ents
 
+@cached(version=_models_version)
+def spacy_fast_NER(text, nlp=None, normalize_text=False):
+    """(text, label, start_char, end_char) of the entities, see
+    SpacyFastEngine."""
+    if nlp is not None or normalize_text:
+        return SpacyFastEngine(nlp, normalize_text)(text)
+    return get_engine("spacy_fast")(text)
 
-def nltk_NER(paragraph):
-    words = nltk.word_tokenize(paragraph)
-    tagged_Words = nltk.pos_tag(words)
 
-    named_Entity = nltk.ne_chunk(tagged_Words)
-    entities = []
-    for x in named_Entity:
-        if isinstance(x, nltk.tree.Tree):
-            entities += [{"label": x.__dict__["_label"],
-                          "pos_tag": [e[1] for e in x],
-                          "tokens": [e[0] for e in x]}]
-    return entities
+@cached(version=_models_version)
+def gazetteer_NER(text, path=None):
+    if path is not None:
+        return GazetteerEngine(path)(text)
+    return get_engine("gazetteer")(text)
+
+
+@cached(version=_models_version)
+def nltk_NER(paragraph):
+    return get_engine("nltk")(paragraph)
 
 
+@cached(version=_models_version)
 def NER(paragraph, engine="nltk"):
-    engine = engine.lower().strip()
-    if engine == "spacy":
-        return spacy_NER(paragraph)
-    elif engine == "fox":
-        return fox_NER(paragraph)
-    elif engine == "polyglot":
-        return polyglot_NER(paragraph)
-    return nltk_NER(paragraph)
+    return get_engine(engine)(paragraph)
+
+
+def NER_many(docs, engine="nltk", batch_size=1000, n_process=1):
+    """Lazily yields the entities of every document of an iterable, in
+    order, with the same output as NER.
+    Documents go through the engine's own batching (nlp.pipe for spacy,
+    tag_sents and parse_sents for nltk), n_process > 1 (or None for all
+    cores) spreads them over processes that each create the engine once."""
+    return get_engine(engine).pipe(docs, batch_size=batch_size,
+                                   n_process=n_process)
+
+
+# Labels of the engines mapped to the spacy names, for voting.
+LABELS = {"ORGANIZATION": "ORG", "I-ORG": "ORG",
+          "LOCATION": "LOC", "I-LOC": "LOC",
+          "PER": "PERSON", "I-PER": "PERSON",
+          "FACILITY": "FAC", "GSP": "GPE"}
+
+# Pools of NER_ensemble, kept between calls, one per kind and number of
+# workers so that a pool handed out is never shut down while in use.
+_executors = {}
+_executors_lock = Lock()
+
+
+@atexit.register
+def _shutdown_executors():
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown()
+        _executors.clear()
+
+
+def _executor(kind, n_workers):
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    pools = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+    if kind not in pools:
+        raise ValueError("unknown executor: %r" % (kind,))
+    with _executors_lock:
+        executor = _executors.get((kind, n_workers))
+        if executor is None:
+            executor = _executors[kind, n_workers] = pools[kind](n_workers)
+        return executor
+
+
+def _engine_spans(name, text):
+    return get_engine(name).spans(text)
+
+
+def _overlaps(a, b):
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def vote(text, spans, weights=None, min_votes=1, labels=LABELS,
+         exact=False):
+    """Merges the (start, end, label) spans found by several engines, a
+    dict of engine name -> spans, into (text, label, start, end).
+    Every span proposed gets the summed weight (1 by default) of the
+    engines with a span of the same label that overlaps it, or that is
+    identical if exact, and is kept if that reaches min_votes. Overlapping
+    spans are resolved by votes, then by the number of engines proposing
+    the very same span, then by length."""
+    weights = weights or {}
+    spans = {engine: set((start, end, labels.get(label.upper(), label.upper()))
+                         for start, end, label in found)
+             for engine, found in spans.items()}
+    scored = []
+    for candidate in set().union(*spans.values()):
+        votes = proposed = 0
+        for engine, found in spans.items():
+            weight = weights.get(engine, 1)
+            if candidate in found:
+                votes += weight
+                proposed += weight
+            elif not exact and any(span[2] == candidate[2] and
+                                   _overlaps(span, candidate)
+                                   for span in found):
+                votes += weight
+        if votes >= min_votes:
+            scored.append((-votes, -proposed, candidate[0] - candidate[1],
+                           candidate))
+    kept = []
+    for _, _, _, candidate in sorted(scored):
+        if not any(_overlaps(candidate, span) for span in kept):
+            kept.append(candidate)
+    return [(text[start:end], label, start, end)
+            for start, end, label in sorted(kept)]
+
+
+@cached(version=_models_version)
+def NER_ensemble(text, engines=("nltk", "spacy"), weights=None, min_votes=1,
+                 executor="thread", labels=LABELS, exact=False):
+    """Runs several engines on text at the same time and merges their
+    entities by vote, returns (text, label, start, end) sorted by start.
+    Engines run in a pool kept between calls, threads by default or
+    processes (executor="process") for engines that hold the GIL, each
+    process then loads every engine once. Labels are mapped with labels,
+    see vote for weights, min_votes and exact."""
+    engines = [engine.lower().strip() for engine in engines]
+    pool = _executor(executor, len(engines))
+    futures = {engine: pool.submit(_engine_spans, engine, text)
+               for engine in engines}
+    spans = {engine: future.result() for engine, future in futures.items()}
+    return vote(text, spans, weights, min_votes, labels, exact)
 
 
 if __name__ == "__main__":
@@ -99,8 +515,15 @@ if __name__ == "__main__":
       'tokens': ['Taj', 'Mahal']},
      {'label': 'PERSON',
       'pos_tag': ['NNP', 'NNP', 'NNP'],
-      'tokens': ['Emperor', 'Shah', 'Jahan']}]  
+      'tokens': ['Emperor', 'Shah', 'Jahan']}]
     """
+    docs = ["The Taj Mahal was built by Emperor Shah Jahan"] * 3
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert NER(docs[0], engine="bogus") == NER(docs[0])
+    assert "unknown NER engine" in str(caught[0].message)
+    assert list(NER_many(docs)) == [NER(doc) for doc in docs]
+    print(NER_ensemble(docs[0], engines=("nltk", "spacy")))
 
     assert NER("The Taj Mahal was built by Emperor Shah Jahan",
                engine="fox") == [{'label': 'ORGANIZATION',
@@ -1,3 +1,5 @@
+from io import StringIO
+
 from syntok.tokenizer import Tokenizer
 import syntok.segmenter as segmenter
 
@@ -26,8 +28,43 @@ def extract_formatted_sentences(document):
             sentences.append(" ".join([token.value for token in sentence]))
     return sentences
 
+def _chunks(document_or_iterable, chunk_size):
+    """Pieces of text of about chunk_size characters, cut at a blank line
+    (a paragraph boundary) whenever possible, and their offsets."""
+    if isinstance(document_or_iterable, str):
+        document_or_iterable = StringIO(document_or_iterable)
+    buffered, size, offset = [], 0, 0
+    for text in document_or_iterable:
+        buffered.append(text)
+        size += len(text)
+        # a paragraph break, or no break at all for too long
+        if size >= chunk_size and (not text.strip() or
+                                   size >= 16 * chunk_size):
+            yield offset, "".join(buffered)
+            buffered, offset, size = [], offset + size, 0
+    if buffered:
+        yield offset, "".join(buffered)
+
+
+def stream_sentences(document_or_iterable, chunk_size=1 << 20):
+    """Lazily yields (sentence, start, end, words) for every sentence of a
+    string or of an iterable of strings, such as an open file. start and
+    end are character offsets in the whole input.
+    The input is segmented in chunks of about chunk_size characters, so
+    memory stays bounded whatever its size."""
+    for offset, chunk in _chunks(document_or_iterable, chunk_size):
+        for paragraph in segmenter.analyze(chunk):
+            for sentence in paragraph:
+                start = sentence[0].offset
+                end = sentence[-1].offset + len(sentence[-1].value)
+                yield chunk[start:end], offset + start, offset + end, \
+                    [token.value for token in sentence]
+
+
 if __name__ == "__main__":
     from pprint import pprint
     document = """London is the capital and most populous city of England and the United Kingdom. Standing on the River Thames in the south east of the island of Great Britain, London has been a major settlement for two millennia.  It was founded by the Romans, who named it Londinium."""
 
     pprint(extract_sentences(document))
+    for sentence, start, end, words in stream_sentences(document):
+        assert document[start:end] == sentence
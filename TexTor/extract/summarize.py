@@ -1,9 +1,9 @@
-import nltk
-import urllib
-import bs4 as bs
+import urllib.request
 import re
 import heapq
 
+from TexTor.cache import cached
+
 
 def wikipedia_pre_process(text):
     text = re.sub(r"\[[0-9]*\]", " ", text)  # For creating the "Summary"
@@ -11,6 +11,7 @@ def wikipedia_pre_process(text):
     return text
 
 def summarize_web(url, html_processing_callback=None):
+    import bs4 as bs
     # Getting the data
     source = urllib.request.urlopen(url).read()
     soup = bs.BeautifulSoup(source, "html.parser")  # parsed source
@@ -26,7 +27,9 @@ def summarize_web(url, html_processing_callback=None):
     return summarize(text)
 
 
+@cached()
 def summarize(text):
+    import nltk
     # Tokenizing the sentence into sentences
     sentences = nltk.sent_tokenize(text)
 
@@ -3,8 +3,6 @@
 
 import os
 import sys
-import nltk
-from nltk.corpus import WordNetCorpusReader
 import xml.etree.ElementTree as ET
 from os.path import dirname, join
 
@@ -97,6 +95,8 @@ class WNAffect(object):
 
     def __init__(self, wordnet16_dir=None, wn_domains_dir=None):
         """Initializes the WordNet-Affect object."""
+        import nltk
+        from nltk.corpus import WordNetCorpusReader
         wordnet16_dir = wordnet16_dir or join(dirname(__file__), "wordnet-1.6")
         wn_domains_dir = wn_domains_dir or join(dirname(__file__), "wn-domains-3.2")
         cwd = os.getcwd()
@@ -1,5 +1,5 @@
 from TexTor.lexicons import LEXICON
-from TexTor.understand import normalize
+from TexTor.utils import normalize
 
 
 def get_color(word):
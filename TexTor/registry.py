@@ -0,0 +1,273 @@
+"""Shared registry of the heavy models (spacy, coreference, taggers).
+
+Every model is loaded at most once per process and looked up by name and
+variant, e.g. ("spacy", "en_core_web_sm") next to ("spacy", "en_core_web_md").
+
+Models loaded in a parent process with preload() are shared copy-on-write
+by the workers it forks (gunicorn --preload, multiprocessing with the fork
+start method). preload() freezes the garbage collector afterwards so that
+collections in the workers do not write to the pages of the shared
+objects, which would copy them.
+
+The resident memory each model added when it was loaded is recorded, and
+with a memory budget the least recently used models are unloaded to stay
+under it. Preloaded models are pinned, unloading them in a worker would
+not give back the shared pages.
+
+Models are loaded outside of the registry lock, under a lock of their own,
+so a slow load only makes the threads that want the same model wait.
+"""
+import gc
+import os
+import sys
+import weakref
+from collections import OrderedDict
+from threading import Lock
+from time import perf_counter, time
+
+from TexTor.settings import SPACY_MODEL, COREF_MODEL
+
+
+def _rss_kb():
+    """Current resident set size of this process, in kilobytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        # no procfs, the peak is the best there is
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def process_memory():
+    """rss_kb of this process and, on linux, pss_kb (shared pages divided
+    between the processes that map them) and shared_kb, to check how much
+    of the preloaded models a worker still shares with its parent."""
+    memory = {"rss_kb": _rss_kb()}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return memory
+    kb = lambda name: int(fields.get(name, "0 kB").split()[0])
+    memory["pss_kb"] = kb("Pss")
+    memory["shared_kb"] = kb("Shared_Clean") + kb("Shared_Dirty")
+    return memory
+
+
+class _Entry(object):
+    __slots__ = ("model", "rss_kb", "seconds", "last_used", "pinned")
+
+    def __init__(self, model, rss_kb, seconds):
+        self.model = model
+        self.rss_kb = rss_kb
+        self.seconds = seconds
+        self.last_used = time()
+        self.pinned = False
+
+
+class ModelRegistry(object):
+    def __init__(self, max_memory_kb=None):
+        """max_memory_kb, if given, is the budget for the memory added by
+        the loaded models, least recently used ones are unloaded when a new
+        load goes over it."""
+        self.max_memory_kb = max_memory_kb
+        self._loaders = {}
+        self._defaults = {}
+        self._models = OrderedDict()
+        # (name, variant) -> lock held while that model is being loaded
+        self._loading = {}
+        self._lock = Lock()
+        self.evictions = 0
+        # a lock held by another thread while forking would stay locked
+        # forever in the child
+        ref = weakref.ref(self)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(
+                after_in_child=lambda: ref() and ref()._after_fork())
+
+    def _after_fork(self):
+        self._lock = Lock()
+        self._loading = {}
+
+    def register(self, name, loader, default=None):
+        """loader(variant) returns the model, default is the variant used
+        when none is asked for."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._defaults[name] = default
+
+    def _key(self, name, variant):
+        if name not in self._loaders:
+            raise KeyError("unknown model: " + name)
+        return name, self._defaults[name] if variant is None else variant
+
+    def get(self, name, variant=None):
+        """The model, loaded on first use."""
+        return self._get(self._key(name, variant))
+
+    def _used(self, key, pin):
+        """The entry of a loaded model, marked as used, or None."""
+        entry = self._models.get(key)
+        if entry is not None:
+            self._models.move_to_end(key)
+            entry.last_used = time()
+            entry.pinned = entry.pinned or pin
+        return entry
+
+    def _get(self, key, pin=False):
+        with self._lock:
+            entry = self._used(key, pin)
+            if entry is not None:
+                return entry.model
+            loading = self._loading.setdefault(key, Lock())
+        with loading:
+            with self._lock:
+                # loaded by another thread while this one waited
+                entry = self._used(key, pin)
+            if entry is not None:
+                return entry.model
+            try:
+                # loads of other models at the same time are counted too
+                before, start = _rss_kb(), perf_counter()
+                model = self._loaders[key[0]](key[1])
+                entry = _Entry(model, max(_rss_kb() - before, 0),
+                               perf_counter() - start)
+                entry.pinned = pin
+                with self._lock:
+                    self._models[key] = entry
+                    evicted = self._evict(keep=key)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        if evicted:
+            self._close(evicted)
+        return model
+
+    def is_loaded(self, name, variant=None):
+        return self._key(name, variant) in self._models
+
+    def preload(self, *models):
+        """Loads the given names, or (name, variant) pairs, pins them and
+        freezes the garbage collector, call it before forking workers."""
+        for model in models:
+            name, variant = (model, None) if isinstance(model, str) \
+                else model
+            self._get(self._key(name, variant), pin=True)
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+    def unload(self, name, variant=None):
+        """Drops the model, returns False if it was not loaded."""
+        with self._lock:
+            entry = self._models.pop(self._key(name, variant), None)
+        if entry is None:
+            return False
+        self._close([entry])
+        return True
+
+    @staticmethod
+    def _close(entries):
+        """Closes the models of unloaded entries and collects them, outside
+        of the registry lock."""
+        while entries:
+            close = getattr(entries.pop().model, "close", None)
+            if close is not None:
+                close()
+                del close
+        gc.collect()
+
+    def clear(self):
+        for name, variant in list(self._models):
+            self.unload(name, variant)
+
+    def memory_kb(self):
+        """Memory added by the loaded models, as measured at load time."""
+        return sum(entry.rss_kb for entry in self._models.values())
+
+    def _evict(self, keep):
+        """Drops the least recently used models over the memory budget,
+        called with the lock held, returns their entries to _close()."""
+        evicted = []
+        if self.max_memory_kb is None:
+            return evicted
+        for key in list(self._models):
+            if self.memory_kb() <= self.max_memory_kb:
+                break
+            if key != keep and not self._models[key].pinned:
+                evicted.append(self._models.pop(key))
+                self.evictions += 1
+        return evicted
+
+    def info(self):
+        """Per model memory, load time and state, plus the totals."""
+        with self._lock:
+            models = OrderedDict(
+                ("{0}:{1}".format(*key), {"rss_kb": entry.rss_kb,
+                                          "load_seconds": entry.seconds,
+                                          "last_used": entry.last_used,
+                                          "pinned": entry.pinned})
+                for key, entry in self._models.items())
+        return {"models": models,
+                "memory_kb": self.memory_kb(),
+                "max_memory_kb": self.max_memory_kb,
+                "evictions": self.evictions,
+                "process": process_memory()}
+
+
+def _load_spacy(name):
+    import spacy
+    return spacy.load(name)
+
+
+# components entity recognition does not need, not even loaded by spacy_ner
+NER_EXCLUDE = ("tagger", "parser", "attribute_ruler", "lemmatizer", "senter",
+               "morphologizer", "textcat", "neuralcoref")
+
+
+def _load_spacy_ner(name):
+    import spacy
+    return spacy.load(name, exclude=NER_EXCLUDE)
+
+
+def _load_coref(name):
+    import sense2vec
+    return sense2vec.load(name)
+
+
+def _load_tagger(engine):
+    from TexTor.understand.tagging import SentenceTagger
+    return SentenceTagger(engine=engine)
+
+
+# The registry used by get_nlp, get_corefnlp and get_tagger.
+models = ModelRegistry()
+models.register("spacy", _load_spacy, SPACY_MODEL)
+models.register("spacy_ner", _load_spacy_ner, SPACY_MODEL)
+models.register("coref", _load_coref, COREF_MODEL)
+models.register("tagger", _load_tagger, "ngram")
+
+
+if __name__ == "__main__":
+    registry = ModelRegistry(max_memory_kb=10 * 1024)
+    registry.register("blob", lambda mb: b"x" * (mb * 1024 * 1024), 4)
+    assert registry.get("blob") is registry.get("blob", 4)
+    registry.get("blob", 8)
+    assert registry.is_loaded("blob", 8) and not registry.is_loaded("blob")
+    assert registry.evictions == 1
+    assert registry.unload("blob", 8) and not registry.unload("blob", 8)
+    # a slow load does not block the models that are already loaded
+    from threading import Event, Thread
+    started, release = Event(), Event()
+    registry.register("slow", lambda _: started.set() or release.wait() or 1)
+    loader = Thread(target=registry.get, args=("slow",))
+    loader.start()
+    started.wait()
+    registry.get("blob")
+    assert not registry.is_loaded("slow")
+    release.set()
+    loader.join()
+    assert registry.get("slow") == 1
+    print(registry.info())
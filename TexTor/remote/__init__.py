@@ -1,8 +1,13 @@
 import requests
 
+from TexTor.cache import cached
+
+
 # use the source https://cogcomp.org/page/demo_view/Coref
+@cached()
 def cogcomp_demo(text):
     url = "https://cogcomp.org/demo_files/Coref.php"
     data = {"lang": "en", "text": text}
     r = requests.post(url, json=data)
+    r.raise_for_status()
     return r.json()
\ No newline at end of file
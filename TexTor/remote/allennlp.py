@@ -1,5 +1,21 @@
 from TexTor.settings import ALLENNLP_URL
 import requests
+from TexTor.cache import cached
+
+
+@cached(version=lambda: ALLENNLP_URL)
+def _NER(text):
+    # raises on failure, errors must not end up in the cache
+    url = ALLENNLP_URL + "named-entity-recognition"
+    data = {"sentence": text}
+    r = requests.post(url, json=data).json()
+    words = r["words"]
+    tags = r["tags"]
+    ents = []
+    for idx, tag in enumerate(tags):
+        if tag != "O":
+            ents.append((words[idx], tag))
+    return ents
 
 
 def NER(text):
@@ -12,21 +28,13 @@ def NER(text):
 
     """
     try:
-        url = ALLENNLP_URL + "named-entity-recognition"
-        data = {"sentence": text}
-        r = requests.post(url, json=data).json()
-        words = r["words"]
-        tags = r["tags"]
-        ents = []
-        for idx, tag in enumerate(tags):
-            if tag != "O":
-                ents.append((words[idx], tag))
-        return ents
+        return _NER(text)
     except Exception as e:
         print(e)
     return text
 
 
+@cached(version=lambda: ALLENNLP_URL)
 def textual_entailment(premise, hypothesis):
     """
     Textual Entailment (TE) takes a pair of sentences and predicts whether the facts in the first necessarily imply the facts in the second one.
@@ -49,6 +57,7 @@ def textual_entailment(premise, hypothesis):
             "neutral": probs[2]}
 
 
+@cached(version=lambda: ALLENNLP_URL)
 def machine_comprehension(question, passage):
     """
     Machine Comprehension (MC) answers natural language questions by selecting an answer span within an evidence text.
@@ -66,6 +75,7 @@ def machine_comprehension(question, passage):
     return r["best_span_str"]
 
 
+@cached(version=lambda: ALLENNLP_URL)
 def semantic_role_labeling(sentence):
     """
     Semantic Role Labeling (SRL) recovers the latent predicate argument structure of a sentence,
@@ -101,6 +111,7 @@ def semantic_role_labeling(sentence):
     return roles
 
 
+@cached(version=lambda: ALLENNLP_URL)
 def constituency_parse(sentence):
     """
     A constituency parse tree breaks a text into sub-phrases, or constituents.
@@ -120,6 +131,7 @@ def constituency_parse(sentence):
     return r
 
 
+@cached(version=lambda: ALLENNLP_URL)
 def information_extraction(sentence):
     """
     Given an input sentence, Open Information Extraction (Open IE) extracts a list of propositions,
@@ -143,6 +155,7 @@ def information_extraction(sentence):
     return data
 
 
+@cached(version=lambda: ALLENNLP_URL)
 def event2mind(sentence):
     """
     The Event2Mind dataset proposes a commonsense inference task between
@@ -172,6 +185,7 @@ def event2mind(sentence):
     return data
 
 
+@cached(version=lambda: ALLENNLP_URL)
 def documentqa(sentence):
     """
     run a web search on the question, and additionally try to identify
@@ -1,13 +1,20 @@
 import requests
+from TexTor.cache import cached
 from TexTor.remote import cogcomp_demo
 
 
+@cached()
+def _neuralcoref_demo(text):
+    # raises on failure, errors must not end up in the cache
+    params = {"text": text}
+    r = requests.get("https://coref.huggingface.co/coref", params=params)
+    r.raise_for_status()
+    return r.json()["corefResText"] or text
+
+
 def neuralcoref_demo(text):
     try:
-        params = {"text": text}
-        r = requests.get("https://coref.huggingface.co/coref",
-                         params=params).json()
-        text = r["corefResText"] or text
+        text = _neuralcoref_demo(text)
     except Exception as e:
         print(e)
     return text
@@ -1,8 +1,10 @@
 import requests
 
+from TexTor.cache import cached
 from TexTor.remote.allennlp import NER as allennlp_NER_demo
 
 
+@cached()
 def polyglot_NER_demo(text):
     """
 
@@ -20,6 +22,7 @@ def polyglot_NER_demo(text):
             }
     url = "https://entityextractor.appspot.com/ner"
     r = requests.post(url, data=data)
+    r.raise_for_status()
 
     t = r.text.replace("<br>", "")
     NER = []
@@ -41,6 +44,16 @@ def polyglot_NER_demo(text):
     return NER
 
 
+@cached()
+def _spacy_NER_demo(text):
+    # raises on failure, errors must not end up in the cache
+    data = {"model": "en_core_web_lg", "text": text}
+    r = requests.post("https://api.explosion.ai/displacy/ent", data)
+    r.raise_for_status()
+    return [(text[e["start"]:e["end"]], e["label"].lower())
+            for e in r.json()]
+
+
 def spacy_NER_demo(text):
     """
 
@@ -52,12 +65,7 @@ def spacy_NER_demo(text):
     """
     ents = []
     try:
-        data = {"model": "en_core_web_lg", "text": text}
-        r = requests.post("https://api.explosion.ai/displacy/ent", data)
-        r = r.json()
-        for e in r:
-            txt = text[e["start"]:e["end"]]
-            ents.append((txt, e["label"].lower()))
+        ents = _spacy_NER_demo(text)
     except Exception as e:
         print(e)
     return ents
@@ -12,3 +12,13 @@ ALLENNLP_URL = "http://demo.allennlp.org/predict/"
 
 
 MODELS_PATH = join(dirname(__file__), "models")
+# precomputed inflections, python -m TexTor.understand.inflect_table
+INFLECTIONS_PATH = join(MODELS_PATH, "inflections.bin")
+# memory-mapped n-gram tagger, an nltk pickle can be converted with
+# python -m TexTor.understand.ngram_tagger tagger.pkl tagger.bin
+TAGGER_PATH = join(MODELS_PATH, "tagger.bin")
+# averaged perceptron tagger, trained with python -m TexTor.understand.perceptron
+PERCEPTRON_PATH = join(MODELS_PATH, "perceptron.npz")
+# term lists compiled for the "gazetteer" NER engine, a "term<TAB>label" file
+# is compiled with python -m TexTor.extract.gazetteer terms.tsv
+GAZETTEER_PATH = join(MODELS_PATH, "gazetteer.bin")
@@ -1,6 +1,9 @@
 from TexTor import get_corefnlp
+from TexTor.cache import cached
+from TexTor.settings import COREF_MODEL
 
 
+@cached(version=lambda: COREF_MODEL)
 def replace_coreferences(text, nlp=None):
     # "My sister has a dog. She loves him." -> "My sister has a dog. My sister loves a dog."
 
@@ -20,3 +23,12 @@ def replace_coreferences(text, nlp=None):
     text = doc._.coref_resolved
     return text
 
+
+def replace_coreferences_stream(texts, nlp=None, batch_size=1000):
+    """ replace coreferences on an iterable of texts, yielding in order
+
+    texts are parsed in batches of batch_size with nlp.pipe
+    """
+    nlp = nlp or get_corefnlp()
+    for doc in nlp.pipe(texts, batch_size=batch_size):
+        yield doc._.coref_resolved
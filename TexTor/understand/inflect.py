@@ -17,6 +17,11 @@
 # 96% for Verbs.find_lexeme() (for regular verbs)
 
 import re
+from functools import partial, wraps
+from os import cpu_count
+
+from TexTor.cache import LRUCache
+from TexTor.understand import inflect_table
 
 VERB, NOUN, ADJECTIVE, ADVERB = "VB", "NN", "JJ", "RB"
 
@@ -24,6 +29,98 @@ VOWELS = "aeiouy"
 re_vowel = re.compile(r"a|e|i|o|u|y", re.I)
 is_vowel = lambda ch: ch in VOWELS
 
+#### CACHE ###############################################################
+# Natural text is Zipfian, the same few thousand words are inflected over
+# and over, so each inflection function sits behind a bounded LRU cache.
+
+CACHE_SIZE = 4096
+
+_caches = {}
+
+
+def _memoize(custom=None):
+    """Puts an LRUCache in front of an inflection function.
+    Calls with a custom dictionary (keyword or positional argument at index
+    custom) bypass the cache, since user-defined replacements can change.
+    """
+    def decorator(function):
+        cache = _caches[function.__name__] = LRUCache(CACHE_SIZE)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not cache.maxsize:
+                return function(*args, **kwargs)
+            key = args
+            if custom is not None:
+                if kwargs.get("custom") or len(args) > custom and args[custom]:
+                    return function(*args, **kwargs)
+                # An empty custom dictionary is the same as no dictionary.
+                key = args[:custom] + args[custom + 1:]
+                kwargs.pop("custom", None)
+            if kwargs:
+                key = (key, tuple(sorted(kwargs.items())))
+            value = cache.get(key)
+            if value is None:
+                value = function(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def cache_info():
+    """Returns the hit, miss and eviction counters of each inflection cache."""
+    return {name: cache.info() for name, cache in _caches.items()}
+
+
+def cache_clear():
+    """Empties all inflection caches and resets their counters."""
+    for cache in _caches.values():
+        cache.clear()
+
+
+def set_cache_size(maxsize=CACHE_SIZE):
+    """Resizes all inflection caches, 0 disables caching, None is unbounded."""
+    for cache in _caches.values():
+        cache.resize(maxsize)
+
+
+#### PRECOMPUTED #########################################################
+# Known words are looked up in a memory-mapped table of inflections built
+# from these rules (see inflect_table.py), only out-of-vocabulary words
+# go through the rules below. The table is opened on first use.
+
+_table = None  # None: not opened yet, False: no table
+
+
+def get_inflection_table():
+    """Returns the table of precomputed inflections, or None."""
+    global _table
+    if _table is None:
+        _table = inflect_table.load_inflection_table() or False
+    return _table or None
+
+
+def set_inflection_table(table=None):
+    """Uses the given InflectionTable, False for none at all, or None to
+    open the default table again on the next lookup. Returns the previous
+    table."""
+    global _table
+    previous, _table = _table, table
+    return previous
+
+
+def _precomputed(word, field):
+    table = get_inflection_table()
+    if table is not None:
+        inflections = table.get(word)
+        if inflections is not None:
+            return inflections[field]
+
+
 #### ARTICLE #############################################################
 # Based on the Ruby Linguistics module by Michael Granger:
 # http://www.deveiate.org/projects/Linguistics/wiki/English
@@ -54,6 +151,7 @@ def definite_article(word):
     return "the"
 
 
+@_memoize()
 def indefinite_article(word):
     """Returns the indefinite article for a given word.
 
@@ -366,7 +464,58 @@ plural_categories = {
     ]
 }
 
+# For performance, category membership is precomputed as sets,
+# words outside of every category can only match general rules.
+plural_category_sets = dict((k, set(v)) for k, v in plural_categories.items())
+plural_category_words = set().union(*plural_category_sets.values())
+
+# For performance, the general rules of each (adjective, classical) subset
+# are compiled into a table indexed by the last character of the word.
+# A rule only goes under the characters its suffix can end with,
+# so a word is only tested against the few rules that could match it.
+plural_automata = {}
+
+
+def _final_chars(pattern):
+    """Returns the set of characters a string matched by the given pattern
+    must end with, or None if it could end with any character.
+    """
+    alternatives, depth, start = [], 0, 0
+    for i, ch in enumerate(pattern):
+        if ch == "(" and pattern[i - 1:i] != "\\":
+            depth += 1
+        elif ch == ")" and pattern[i - 1:i] != "\\":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            alternatives.append(pattern[start:i])
+            start = i + 1
+    alternatives.append(pattern[start:])
+    chars = set()
+    for p in alternatives:
+        # Only a plain letter before the end anchor, e.g. "([cs])h$".
+        if len(p) < 2 or not p.endswith("$") or not p[-2].isalpha() \
+                or p[-3:-2] == "\\":
+            return None
+        chars.add(p[-2])
+    return chars
+
+
+def _plural_automaton(adjective=False, classical=True):
+    if (adjective, classical) not in plural_automata:
+        rules = [(suffix, inflection, _final_chars(suffix.pattern))
+                 for i in (adjective and [0, 1] or range(len(plural_rules)))
+                 for suffix, inflection, category, classic in plural_rules[i]
+                 if category is None and (not classic or classical)]
+        table = {}
+        for ch in set().union(*[chars for s, i, chars in rules if chars]):
+            table[ch] = [(s, i) for s, i, chars in rules
+                         if chars is None or ch in chars]
+        default = [(s, i) for s, i, chars in rules if chars is None]
+        plural_automata[(adjective, classical)] = (table, default)
+    return plural_automata[(adjective, classical)]
 
+
+@_memoize(custom=2)
 def pluralize(word, pos=NOUN, custom=None, classical=True):
     """ Returns the plural of a given word, e.g., child => children.
         Handles nouns and adjectives, using classical inflection by default
@@ -376,6 +525,10 @@ def pluralize(word, pos=NOUN, custom=None, classical=True):
     custom = custom or {}
     if word in custom:
         return custom[word]
+    if not custom and classical and not pos.startswith(ADJECTIVE):
+        plural = _precomputed(word, inflect_table.PLURAL)
+        if plural is not None:
+            return plural
     # Recurse genitives.
     # Remove the apostrophe and any trailing -s,
     # form the plural of the resultant noun, and then append an apostrophe
@@ -404,6 +557,17 @@ def pluralize(word, pos=NOUN, custom=None, classical=True):
     if pos.startswith(ADJECTIVE):
         n = [0, 1]
     # Apply pluralization rules.
+    # "$" also matches before a trailing newline, so such words take the
+    # long way and are tested against every rule.
+    if (n == [0, 1] or word not in plural_category_words) \
+            and not word.endswith("\n"):
+        table, default = _plural_automaton(n == [0, 1], bool(classical))
+        for suffix, inflection in table.get(word[-1:], default):
+            m = suffix.search(word)
+            if m is not None:
+                # Suffix rules match once, at the end of the word.
+                return word[:m.start()] + m.expand(inflection) + word[m.end():]
+        return word
     for i in n:
         for suffix, inflection, category, classic in plural_rules[i]:
             # A general rule, or a classic rule in classical mode.
@@ -413,7 +577,7 @@ def pluralize(word, pos=NOUN, custom=None, classical=True):
                         return suffix.sub(inflection, word)
             # A rule pertaining to a specific category of words.
             if category is not None:
-                if word in plural_categories[category] and (not classic or (classic and classical)):
+                if word in plural_category_sets[category] and (not classic or (classic and classical)):
                     if suffix.search(word) is not None:
                         return suffix.sub(inflection, word)
     return word
@@ -565,12 +729,30 @@ singular_irregular = {
     "zoa": "zoon",
 }
 
+# For performance, index the exception lists by suffix once,
+# so each lookup costs O(len(word)) instead of O(len(list)).
+# A word is uninflected (or uncountable) if it is a suffix of a listed word:
+singular_unchanged = set(x[i:] for x in singular_uninflected | singular_uncountable
+                         for i in range(len(x) + 1))
+# A word is an -ie plural if it ends with a listed word + "s":
+singular_ie_plural = set(x + "s" for x in singular_ie)
+singular_ie_lengths = sorted(set(len(x) for x in singular_ie_plural))
+# Irregular plurals are tried in order, the first listed suffix wins:
+singular_irregular_order = dict((x, i) for i, x in enumerate(singular_irregular))
+singular_irregular_lengths = sorted(set(len(x) for x in singular_irregular))
+singular_irregular_rules = dict((x, re.compile('(?i)' + x + '$')) for x in singular_irregular)
+
 
+@_memoize(custom=2)
 def singularize(word, pos=NOUN, custom=None):
     """Returns the singular of a given word."""
     custom = custom or {}
     if word in custom:
         return custom[word]
+    if not custom:
+        singular = _precomputed(word, inflect_table.SINGULAR)
+        if singular is not None:
+            return singular
     # Recurse compound words (e.g. mothers-in-law).
     if "-" in word:
         w = word.split("-")
@@ -580,18 +762,16 @@ def singularize(word, pos=NOUN, custom=None):
     if word.endswith("'"):
         return singularize(word[:-1]) + "'s"
     w = word.lower()
-    for x in singular_uninflected:
-        if x.endswith(w):
-            return word
-    for x in singular_uncountable:
-        if x.endswith(w):
-            return word
-    for x in singular_ie:
-        if w.endswith(x + "s"):
+    if w in singular_unchanged:
+        return word
+    for n in singular_ie_lengths:
+        if n <= len(w) and w[-n:] in singular_ie_plural:
             return w
-    for x in singular_irregular:
-        if w.endswith(x):
-            return re.sub('(?i)' + x + '$', singular_irregular[x], word)
+    irregular = [w[-n:] for n in singular_irregular_lengths
+                 if n <= len(w) and w[-n:] in singular_irregular]
+    if irregular:
+        x = min(irregular, key=singular_irregular_order.get)
+        return singular_irregular_rules[x].sub(singular_irregular[x], word)
     for suffix, inflection in singular_rules:
         m = suffix.search(word)
         g = m and m.groups() or []
@@ -603,6 +783,551 @@ def singularize(word, pos=NOUN, custom=None):
     return word
 
 
+#### VERBS ###############################################################
+# Pattern conjugates with a lexicon of 8,500 verbs (en-verbs.txt). Only the
+# verbs the find_lemma() and find_lexeme() rules get wrong are kept here:
+# irregular verbs, spelling exceptions, verbs that double their final
+# consonant and verbs whose lemma the rules can not recover.
+
+INFINITIVE, PRESENT, PAST = INF, PRES, PST = "infinitive", "present", "past"
+PARTICIPLE, PAST_PARTICIPLE = PART, PPART = "participle", "past participle"
+SINGULAR, PLURAL = SG, PL = "singular", "plural"
+
+verb_tenses = {
+    "inf": INFINITIVE, "infinitive": INFINITIVE,
+    "pres": PRESENT, "present": PRESENT,
+    "pst": PAST, "past": PAST,
+    "part": PARTICIPLE, "participle": PARTICIPLE,
+    "ppart": PAST_PARTICIPLE, "past participle": PAST_PARTICIPLE
+}
+
+# A lexeme holds the forms of a verb, in the order of pattern:
+# infinitive, present 1sg, 2sg, 3sg, plural, present participle,
+# past 1sg, 2sg, 3sg, plural, past, past participle.
+verb_be = ("be", "am", "are", "is", "are", "being",
+           "was", "were", "was", "were", "were", "been")
+
+# infinitive, 3rd person singular, present participle, past, past participle
+verb_irregular = """
+arise arises arising arose arisen; awake awakes awaking awoke awoken;
+bear bears bearing bore borne; beat beats beating beat beaten;
+become becomes becoming became become; begin begins beginning began begun;
+bend bends bending bent bent; bet bets betting bet bet;
+bid bids bidding bid bid; bind binds binding bound bound;
+bite bites biting bit bitten; bleed bleeds bleeding bled bled;
+blow blows blowing blew blown; break breaks breaking broke broken;
+breed breeds breeding bred bred; bring brings bringing brought brought;
+broadcast broadcasts broadcasting broadcast broadcast;
+build builds building built built; burst bursts bursting burst burst;
+buy buys buying bought bought; cast casts casting cast cast;
+catch catches catching caught caught; choose chooses choosing chose chosen;
+cling clings clinging clung clung; come comes coming came come;
+cost costs costing cost cost; creep creeps creeping crept crept;
+cut cuts cutting cut cut; deal deals dealing dealt dealt;
+dig digs digging dug dug; do does doing did done;
+draw draws drawing drew drawn; drink drinks drinking drank drunk;
+drive drives driving drove driven; dwell dwells dwelling dwelt dwelt;
+eat eats eating ate eaten; fall falls falling fell fallen;
+feed feeds feeding fed fed; feel feels feeling felt felt;
+fight fights fighting fought fought; find finds finding found found;
+flee flees fleeing fled fled; fling flings flinging flung flung;
+fly flies flying flew flown; forbid forbids forbidding forbade forbidden;
+forecast forecasts forecasting forecast forecast;
+foresee foresees foreseeing foresaw foreseen;
+forget forgets forgetting forgot forgotten;
+forgive forgives forgiving forgave forgiven;
+freeze freezes freezing froze frozen; get gets getting got gotten;
+give gives giving gave given; go goes going went gone;
+grind grinds grinding ground ground; grow grows growing grew grown;
+hang hangs hanging hung hung; have has having had had;
+hear hears hearing heard heard; hide hides hiding hid hidden;
+hit hits hitting hit hit; hold holds holding held held;
+hurt hurts hurting hurt hurt; keep keeps keeping kept kept;
+kneel kneels kneeling knelt knelt; know knows knowing knew known;
+lay lays laying laid laid; lead leads leading led led;
+leap leaps leaping leapt leapt; leave leaves leaving left left;
+lend lends lending lent lent; let lets letting let let;
+lie lies lying lay lain; light lights lighting lit lit;
+lose loses losing lost lost; make makes making made made;
+mean means meaning meant meant; meet meets meeting met met;
+mislead misleads misleading misled misled;
+mistake mistakes mistaking mistook mistaken;
+misunderstand misunderstands misunderstanding misunderstood misunderstood;
+overcome overcomes overcoming overcame overcome;
+override overrides overriding overrode overridden;
+oversee oversees overseeing oversaw overseen;
+overtake overtakes overtaking overtook overtaken;
+overthrow overthrows overthrowing overthrew overthrown;
+pay pays paying paid paid; put puts putting put put;
+quit quits quitting quit quit; read reads reading read read;
+redo redoes redoing redid redone; rewrite rewrites rewriting rewrote rewritten;
+rid rids ridding rid rid; ride rides riding rode ridden;
+ring rings ringing rang rung; rise rises rising rose risen;
+run runs running ran run; say says saying said said;
+see sees seeing saw seen; seek seeks seeking sought sought;
+sell sells selling sold sold; send sends sending sent sent;
+set sets setting set set; sew sews sewing sewed sewn;
+shake shakes shaking shook shaken; shed sheds shedding shed shed;
+shine shines shining shone shone; shoot shoots shooting shot shot;
+show shows showing showed shown; shrink shrinks shrinking shrank shrunk;
+shut shuts shutting shut shut; sing sings singing sang sung;
+sink sinks sinking sank sunk; sit sits sitting sat sat;
+slay slays slaying slew slain; sleep sleeps sleeping slept slept;
+slide slides sliding slid slid; sling slings slinging slung slung;
+slit slits slitting slit slit; speak speaks speaking spoke spoken;
+speed speeds speeding sped sped; spend spends spending spent spent;
+spin spins spinning spun spun; spit spits spitting spat spat;
+split splits splitting split split; spread spreads spreading spread spread;
+spring springs springing sprang sprung; stand stands standing stood stood;
+steal steals stealing stole stolen; stick sticks sticking stuck stuck;
+sting stings stinging stung stung; stink stinks stinking stank stunk;
+stride strides striding strode stridden; strike strikes striking struck struck;
+string strings stringing strung strung; strive strives striving strove striven;
+swear swears swearing swore sworn; sweep sweeps sweeping swept swept;
+swell swells swelling swelled swollen; swim swims swimming swam swum;
+swing swings swinging swung swung; take takes taking took taken;
+teach teaches teaching taught taught; tear tears tearing tore torn;
+tell tells telling told told; think thinks thinking thought thought;
+throw throws throwing threw thrown; thrust thrusts thrusting thrust thrust;
+tread treads treading trod trodden;
+understand understands understanding understood understood;
+undertake undertakes undertaking undertook undertaken;
+undo undoes undoing undid undone; upset upsets upsetting upset upset;
+wake wakes waking woke woken; wear wears wearing wore worn;
+weave weaves weaving wove woven; weep weeps weeping wept wept;
+win wins winning won won; wind winds winding wound wound;
+withdraw withdraws withdrawing withdrew withdrawn;
+withhold withholds withholding withheld withheld;
+withstand withstands withstanding withstood withstood;
+wring wrings wringing wrung wrung; write writes writing wrote written
+"""
+
+# Compounds of irregular verbs and spelling exceptions of pattern's lexicon,
+# in the same format.
+verb_exceptions = """
+abide abides abiding abode abode; acquit acquits acquitting acquitted
+acquitted; ante antes anteing anteed anteed; babysit babysits babysitting
+babysat babysat; backbite backbites backbiting backbit backbitten; backslide
+backslides backsliding backslidden backslidden; befall befalls befalling
+befell befallen; beget begets begetting begot begotten; behold beholds
+beholding beheld beheld; beseech beseeches beseeching besought besought;
+beset besets besetting beset beset; bespeak bespeaks bespeaking bespoke
+bespoken; bestrew bestrews bestrewing bestrewed bestrewn; bestride bestrides
+bestriding bestrode bestrode; betake betakes betaking betook betaken;
+bethink bethinks bethinking bethought bethought; bivouac bivouacs
+bivouacking bivouacked bivouacked; blah blahs blahing blahed blahed; boogie
+boogies boogieing boogied boogied; bottlefeed bottlefeeds bottlefeeding
+bottlefed bottlefed; breastfeed breastfeeds breastfeeding breastfed
+breastfed; browbeat browbeats browbeating browbeat browbeaten; clad clads
+cladding clad clad; cleave cleaves cleaving clove cloven; copyread copyreads
+copyreading copyread copyread; coquet coquets coquetting coquetted
+coquetted; countersink countersinks countersinking countersank countersunk;
+cross-breed cross-breeds cross-breeding cross-bred cross-bred; crosscut
+crosscuts crosscutting crosscut crosscut; deepfreeze deepfreezes
+deepfreezing deepfrozen deepfrozen; die-cast die-casts die-casting die-cast
+die-cast; dive dives diving dove dived; duel duels duelling duelled duelled;
+enwind enwinds enwinding enwound enwound; equip equips equipping equipped
+equipped; eye eyes eying eyed eyed; fine-draw fine-draws fine-drawing
+fine-drew fine-drawn; floodlight floodlights floodlighting floodlit
+floodlit; flyblow flyblows flyblowing flyblew flyblown; forbear forbears
+forbearing forbore forborne; forcefeed forcefeeds forcefeeding forcefed
+forcefed; foredo foredoes foredoing foredid foredone; foreknow foreknows
+foreknowing foreknew foreknown; forerun foreruns forerunning foreran
+forerun; foreshow foreshows foreshowing foreshowed foreshown; forespeak
+forespeaks forespeaking forespoke forespoken; foreswear foreswears
+foreswearing foreswore foresworn; foretell foretells foretelling foretold
+foretold; forgo forgoes forgoing forwent forgone; forsake forsakes forsaking
+forsook forsaken; forspeak forspeaks forspeaking forspoke forspoken;
+forswear forswears forswearing forswore forsworn; fret frets fretting
+fretted frets; fuel fuels fuelling fuelled fuelled; gainsay gainsays
+gainsaying gainsaid gainsaid; ghostwrite ghostwrites ghostwriting ghostwrote
+ghostwritten; grave graves graving graven graven; gyp gyps gypping gypped
+gypped; hamstring hamstrings hamstringing hamstrung hamstrung; handfeed
+handfeeds handfeeding handfed handfed; havoc havocs havocking havocked
+havocked; hew hews hewing hewed hewn; hocuspocus hocuspocuses hocuspocussing
+hocuspocussed hocuspocussed; impulse-buy impulse-buys impulse-buying
+impulse-bought impulse-bought; indwell indwells indwelling indwelt indwelt;
+initial initials initialling initialled initialled; inlay inlays inlaying
+inlaid inlaid; inlet inlets inletting inlet inlet; inset insets insetting
+inset inset; interbreed interbreeds interbreeding interbred interbred;
+intercut intercuts intercutting intercut intercut; interlay interlays
+interlaying interlaid interlaid; interweave interweaves interweaving
+interwove interwoven; inweave inweaves inweaving inwove inwoven; jerrybuild
+jerrybuilds jerrybuilding jerrybuilt jerrybuilt; lade lades lading laded
+laden; lipread lipreads lipreading lipread lipread; misbecome misbecomes
+misbecoming misbecame misbecame; miscast miscasts miscasting miscast
+miscast; misdeal misdeals misdealing misdealt misdealt; misgive misgives
+misgiving misgave misgiven; mishear mishears mishearing misheard misheard;
+mishit mishits mishitting mishit mishit; mislay mislays mislaying mislaid
+mislaid; misread misreads misreading misread misread; misspend misspends
+misspending misspent misspent; mow mows mowing mowed mown; offset offsets
+offsetting offset offset; outbid outbids outbidding outbid outbidden;
+outbreed outbreeds outbreeding outbred outbred; outdo outdoes outdoing
+outdid outdone; outfight outfights outfighting outfought outfought; outgo
+outgoes outgoing outwent outgone; outgrow outgrows outgrowing outgrew
+outgrown; outlay outlays outlaying outlaid outlaid; outride outrides
+outriding outrode outridden; outrun outruns outrunning outran outrun;
+outsell outsells outselling outsold outsold; outshine outshines outshining
+outshone outshone; outshoot outshoots outshooting outshot outshot; outspread
+outspreads outspreading outspread outspread; outstand outstands outstanding
+outstood outstood; outthink outthinks outthinking outthought outthought;
+outwear outwears outwearing outwore outworn; overbear overbears overbearing
+overbore overborne; overbid overbids overbidding overbid overbidden;
+overblow overblows overblowing overblew overblown; overbuild overbuilds
+overbuilding overbuilt overbuilt; overdo overdoes overdoing overdid
+overdone; overdraw overdraws overdrawing overdrew overdrawn; overdrive
+overdrives overdriving overdrove overdriven; overeat overeats overeating
+overate overeaten; overfeed overfeeds overfeeding overfed overfed; overfly
+overflies overflying overflew overflown; overgrow overgrows overgrowing
+overgrew overgrown; overhang overhangs overhanging overhung overhung;
+overhear overhears overhearing overheard overheard; overlay overlays
+overlaying overlaid overlaid; overleap overleaps overleaping overleapt
+overleapt; overlie overlies overlying overlay overlain; overpay overpays
+overpaying overpaid overpaid; overrun overruns overrunning overran overrun;
+oversell oversells overselling oversold oversold; overset oversets
+oversetting overset overset; oversew oversews oversewing oversewed oversewn;
+overshoot overshoots overshooting overshot overshot; oversleep oversleeps
+oversleeping overslept overslept; overspend overspends overspending
+overspent overspent; overspill overspills overspilling overspilt overspilt;
+overwind overwinds overwinding overwound overwound; overwrite overwrites
+overwriting overwrote overwritten; partake partakes partaking partook
+partaken; photoset photosets photosetting photoset photoset; pinchhit
+pinchhits pinchhitting pinchhit pinchhit; precast precasts precasting
+precast precast; prepay prepays prepaying prepaid prepaid; proofread
+proofreads proofreading proofread proofread; prove proves proving proved
+proven; quickfreeze quickfreezes quickfreezing quickfroze quickfrozen; quip
+quips quipping quipped quipped; razor-cut razor-cuts razor-cutting razor-cut
+razor-cut; rebuild rebuilds rebuilding rebuilt rebuilt; recast recasts
+recasting recast recast; recce recces recceing recced recced; refuel refuels
+refuelling refuelled refuelled; rehear rehears rehearing reheard reheard;
+remake remakes remaking remade remade; rend rends rending rent rent; repay
+repays repaying repaid repaid; reread rereads rereading reread reread; rerun
+reruns rerunning reran rerun; resell resells reselling resold resold; reset
+resets resetting reset reset; resit resits resitting resat resat; restring
+restrings restringing restrung restrung; retake retakes retaking retook
+retaken; retell retells retelling retold retold; rethink rethinks rethinking
+rethought rethought; rewind rewinds rewinding rewound rewound; rive rives
+riving rived riven; roughcast roughcasts roughcasting roughcast roughcast;
+roughhew roughhews roughhewing roughhewn roughhewn; sandcast sandcasts
+sandcasting sandcast sandcast; shear shears shearing sheared shorn; shellac
+shellacs shellacking shellacked shellacked; shend shends shending shent
+shent; shew shews shewing shewed shewn; shit shits shitting shit shit; shoe
+shoes shoeing shod shod; shrive shrives shriving shrove shriven; sightread
+sightreads sightreading sightread sightread; sightsee sightsees sightseeing
+sightsaw sightseen; singe singes singeing singed singed; slink slinks
+slinking slunk slunk; sneak sneaks sneaking snuck snuck; soothsay soothsays
+soothsaying soothsaid soothsaid; sortie sorties sortieing sortied sortied;
+sow sows sowing sowed sown; spae spaes spaeing spaed spaed; spellbind
+spellbinds spellbinding spellbound spellbound; spoon-feed spoon-feeds
+spoon-feeding spoon-fed spoon-fed; spotlight spotlights spotlighting spotlit
+spotlit; squat squats squatting squatted squatted; stallfeed stallfeeds
+stallfeeding stallfed stallfed; strew strews strewing strewed strewn; sublet
+sublets subletting sublet sublet; swinge swinges swingeing swinged swinged;
+talc talcs talcking talcked talcked; tarmac tarmacs tarmacking tarmacked
+tarmacked; testdrive testdrives testdriving testdrove testdriven; tinge
+tinges tingeing tinged tinged; typecast typecasts typecasting typecast
+typecast; typeset typesets typesetting typeset typeset; typewrite typewrites
+typewriting typewrote typewritten; unbend unbends unbending unbent unbent;
+unbind unbinds unbinding unbound unbound; underbid underbids underbidding
+underbid underbidden; underbuy underbuys underbuying underbought
+underbought; undercut undercuts undercutting undercut undercut; underfeed
+underfeeds underfeeding underfed underfed; undergo undergoes undergoing
+underwent undergone; underlay underlays underlaying underlaid underlaid;
+underlet underlets underletting underlet underlet; underlie underlies
+underlying underlay underlain; underpay underpays underpaying underpaid
+underpaid; undersell undersells underselling undersold undersold; underset
+undersets undersetting underset underset; underwrite underwrites
+underwriting underwrote underwritten; unfreeze unfreezes unfreezing unfroze
+unfrozen; unlay unlays unlaying unlaid unlaid; unmake unmakes unmaking
+unmade unmade; unreeve unreeves unreeving unrove unrove; unsay unsays
+unsaying unsaid unsaid; unsling unslings unslinging unslung unslung; unspeak
+unspeaks unspeaking unspoke unspoken; unstick unsticks unsticking unstuck
+unstuck; unstring unstrings unstringing unstrung unstrung; unswear unswears
+unswearing unswore unsworn; unteach unteaches unteaching untaught untaught;
+unthink unthinks unthinking unthought unthought; untread untreads untreading
+untrod untrodden; unwind unwinds unwinding unwound unwound; upbuild upbuilds
+upbuilding upbuilt upbuilt; upcast upcasts upcasting upcast upcast; uphold
+upholds upholding upheld upheld; uppercut uppercuts uppercutting uppercut
+uppercut; uprise uprises uprising uprose uprisen; upspring upsprings
+upspringing upsprung upsprung; upsweep upsweeps upsweeping upswept upswept;
+upswing upswings upswinging upswung upswung; victual victuals victualling
+victualled victualled; waylay waylays waylaying waylaid waylaid; winterfeed
+winterfeeds winterfeeding winterfed winterfed; wiredraw wiredraws
+wiredrawing wiredrew wiredrawn; yap yaps yapping yapped yapped
+"""
+
+
+def _lexeme(inf, s3, part, past, ppart):
+    return (inf, inf, inf, s3, inf, part) + (past,) * 5 + (ppart,)
+
+
+# lemma => lexeme and any form => lemma, both O(1) lookups.
+verb_lexemes = {"be": verb_be}
+# Irregular verbs come last so that their forms win: found => find.
+verb_lexemes.update((forms[0], _lexeme(*forms)) for forms in (
+    entry.split() for entry in
+    (verb_exceptions + ";" + verb_irregular).split(";")))
+verb_lemmas = dict((form, lemma) for lemma, lexeme in verb_lexemes.items()
+                   for form in lexeme)
+# A form that is also a lemma stays itself (lay, not lie).
+verb_lemmas.update((lemma, lemma) for lemma in verb_lexemes)
+verb_lemmas.update({"'m": "be", "'re": "be", "'s": "be", "ai": "be",
+                    "'d": "would", "'ll": "will", "'ve": "have"})
+
+# Multi-syllable verbs that double the final consonant: those stressed on
+# the last syllable (preferred, but offered) and, as in pattern's lexicon,
+# most verbs in -l (travelled).
+verb_doubling = set((
+    "abet", "abhor", "about-ship", "abut", "acquit", "adlib", "admit",
+    "airdrop", "allot", "annul", "aver", "backpedal", "ballyrag", "barrel",
+    "bedevil", "bedim", "befit", "befog", "bejewel", "bestir", "birddog",
+    "blackleg", "booby-trap", "bootleg", "brevet", "bullshit", "bullwhip",
+    "bullyrag", "bushel", "cabal", "canal", "cancel", "caravan", "carburet",
+    "carillon", "carol", "catnap", "cavil", "channel", "chisel", "chitchat",
+    "commit", "compel", "complot", "concur", "confab", "confer", "control",
+    "coquet", "corbel", "corral", "costar", "counsel", "counterplot",
+    "cudgel", "curvet", "debag", "debar", "debug", "decontrol", "defer",
+    "demit", "demob", "demur", "deter", "diagram", "disannul", "disbar",
+    "disbud", "disembowel", "dishevel", "disinter", "dispel", "double-stop",
+    "drivel", "duel", "earwig", "eavesdrop", "embed", "emit", "enamel",
+    "englut", "enrol", "entrammel", "entrap", "enwrap", "equip", "estop",
+    "excel", "expel", "extol", "featherbed", "flannel", "flimflam",
+    "foot-slog", "format", "frivol", "fuel", "funnel", "gambol", "giftwrap",
+    "globe-trot", "gossip", "gravel", "grovel", "gyp", "hand-knit",
+    "handicap", "hedgehop", "heroworship", "highhat", "hobnob", "hocuspocus",
+    "horsewhip", "housel", "hovel", "humbug", "imbed", "impanel", "impel",
+    "incur", "infer", "initial", "inspan", "inter", "intercrop", "interlap",
+    "intermit", "intromit", "inwrap", "japan", "jewel", "jog-trot", "joypop",
+    "kennel", "kernel", "kidnap", "label", "lallygag", "leapfrog", "level",
+    "libel", "manumit", "marcel", "marshal", "marvel", "medal", "misfit",
+    "model", "name-drop", "nickel", "nid-nod", "occur", "omit", "outcrop",
+    "outfit", "outgeneral", "outgun", "outman", "outrival", "outspan",
+    "outstrip", "outwit", "overcrop", "overlap", "overman", "overstep",
+    "overtop", "panel", "parallel", "parcel", "patrol", "pencil", "permit",
+    "pettifog", "photomap", "photostat", "pistol", "pistolwhip", "pitapat",
+    "pommel", "precancel", "prefer", "pretermit", "propel", "pummel",
+    "putput", "quarrel", "quickstep", "quip", "rappel", "ravel", "rebel",
+    "rebut", "recommit", "recur", "redpencil", "refer", "refit", "refuel",
+    "regret", "rejig", "remit", "repel", "repot", "retrofit", "revel",
+    "revet", "ricochet", "rival", "rowel", "sandbag", "sharecrop", "shikar",
+    "shotgun", "shovel", "shrinkwrap", "shrivel", "sidestep", "signal",
+    "single-step", "skinnydip", "skinpop", "snivel", "softpedal", "spancel",
+    "spiral", "squat", "stencil", "submit", "subtotal", "sulphuret", "symbol",
+    "tassel", "teasel", "tinsel", "tittup", "total", "towel", "trammel",
+    "transfer", "transmit", "transship", "travel", "trepan", "trowel",
+    "tunnel", "tut-tut", "unbar", "uncap", "unclog", "underpin", "underprop",
+    "unfit", "unknit", "unman", "unpeg", "unpin", "unplug", "unravel",
+    "unrig", "unrip", "unship", "unsnap", "unstep", "unstop", "unwrap",
+    "unzip", "victual", "wadset", "wigwag", "wildcat", "windowshop",
+    "worship", "yap", "zigzag"
+))
+
+
+def _count_syllables(word):
+    """ Returns the estimated number of syllables in the word by counting vowel-groups.
+    """
+    n = 0
+    p = False  # True if the previous character was a vowel.
+    for ch in word.endswith("e") and word[:-1] or word:
+        v = ch in VOWELS
+        n += int(v and not p)
+        p = v
+    return n
+
+
+def find_lemma(verb):
+    """Returns the base form of the given inflected regular verb, using a
+    rule-based approach. This is problematic if a verb ending in -e is
+    given in the past tense or gerund."""
+    v = verb.lower()
+    # Base forms that look inflected: embed, pass, focus, need, proceed.
+    if v in verb_doubling or v.endswith(("ss", "us", "is")) \
+            or v.endswith("eed") and (v.endswith("ceed") or len(v) <= 4):
+        return v
+    if v.endswith("s"):
+        if v.endswith("ies") and len(v) > 3 and v[-4] not in VOWELS:
+            return v[:-3] + "y"  # complies => comply
+        if v.endswith(("sses", "shes", "ches", "xes", "zzes")):
+            return v[:-2]  # kisses => kiss
+        return v[:-1]
+    if v.endswith("ied") and len(v) > 4:
+        return v[:-3] + "y"  # envied => envy
+    if v.endswith("ying") and len(v) == 5:
+        return v[:-4] + "ie"  # dying => die
+    if v.endswith("ing") and len(v) > 4:
+        v = v[:-3]
+        if v.endswith("e"):
+            return v  # agreeing => agree
+    elif v.endswith("ed") and len(v) > 3:
+        v = v[:-2]
+    else:
+        return v
+    # Doubled consonant after short vowel: chopped => chop.
+    if len(v) > 3 and v[-1] == v[-2] and v[-3] in VOWELS \
+            and v[-4] not in VOWELS and not v.endswith(("ss", "zz")) \
+            and (not v.endswith("ll") or v[:-1] in verb_doubling):
+        return v[:-1]
+    if v.endswith(("ick", "ack")) and _count_syllables(v) > 1:
+        return v[:-1]  # panicked => panic
+    # Guess common cases where the base form ends in -e:
+    if v.endswith(("v", "z", "c", "u")) or v.endswith("i") and len(v) < 3:
+        return v + "e"  # danced => dance
+    if v.endswith("g") and not v.endswith(("dg", "lg", "ng", "rg")) \
+            or v.endswith(("dg", "rg")):
+        return v + "e"  # indulged => indulge
+    if v.endswith(("b", "d", "g", "k", "l", "m", "p", "r", "s", "t")) \
+            and len(v) > 1 and v[-2] in VOWELS \
+            and (len(v) == 2 or v[-3] not in VOWELS) \
+            and not v.endswith(("er", "en", "it", "et", "on", "om", "el")):
+        return v + "e"  # generated => generate
+    if v.endswith("n") and v.endswith(("an", "in")) \
+            and not v.endswith(("ain", "oin", "oan")):
+        return v + "e"  # imagined => imagine
+    if v.endswith("l") and len(v) > 1 and v[-2] not in VOWELS \
+            and v[-2] != "l" and not v.endswith("rl"):
+        return v + "e"  # squabbled => squabble
+    if v.endswith(("th", "ang", "cr", "vr", "rs", "ps", "tr", "iat", "uat",
+                   "ais", "aus", "eas", "ois", "uis")):
+        return v + "e"  # breathed => breathe, raised => raise
+    if v.endswith("e"):
+        return v + "e"  # agreed => agree
+    return v
+
+
+def find_lexeme(verb):
+    """For a regular verb (base form), returns the forms using a
+    rule-based approach."""
+    v = verb.lower()
+    if v.endswith("ie"):
+        # Verbs ending in -ie: die, lie, tie.
+        return _lexeme(v, v + "s", v[:-2] + "ying", v + "d", v + "d")
+    if v.endswith(("ee", "oe", "ye")):
+        # Verbs ending in a long e sound: agree, hoe, eye.
+        return _lexeme(v, v + "s", v + "ing", v + "d", v + "d")
+    if v.endswith("e"):
+        # Verbs ending in an e: dance, save, devote, evolve, argue.
+        return _lexeme(v, v + "s", v[:-1] + "ing", v + "d", v + "d")
+    if len(v) > 1 and v.endswith("y") and v[-2] not in VOWELS:
+        # Verbs ending in a consonant followed by "y": comply, copy, magnify.
+        return _lexeme(v, v[:-1] + "ies", v + "ing", v[:-1] + "ied",
+                       v[:-1] + "ied")
+    if v.endswith(("s", "sh", "ch", "x", "zz")) \
+            or len(v) > 1 and v.endswith("o") and v[-2] not in VOWELS:
+        # Verbs ending in sibilants or in -o: kiss, focus, polish, box, echo.
+        return _lexeme(v, v + "es", v + "ing", v + "ed", v + "ed")
+    if v.endswith("ic"):
+        # Verbs ending in -ic: panic, mimic.
+        return _lexeme(v, v + "s", v + "king", v + "ked", v + "ked")
+    if len(v) > 2 and v[-1] not in VOWELS + "wx" and v[-2] in "aeiou" \
+            and v[-3] not in VOWELS \
+            and (_count_syllables(v) == 1 or v in verb_doubling):
+        # Verbs ending in a stressed short vowel followed by a consonant:
+        # chat, chop, or compel.
+        return _lexeme(v, v + "s", v + v[-1] + "ing", v + v[-1] + "ed",
+                       v + v[-1] + "ed")
+    # Verbs ending in a consonant cluster, a long vowel or diphthong,
+    # or an unstressed syllable: delight, paint, play, visit, open.
+    return _lexeme(v, v + "s", v + "ing", v + "ed", v + "ed")
+
+
+# Regular verbs whose forms find_lemma() can not take back to the lemma:
+# silent -e (created), doubled consonants (shred), -ye and -oe (dyed).
+verb_regular = """
+accrete ache acquire adhere alibi anchor anele arouse atone attack attune
+augur avalanche avenge awe axe babbitt backtrack badmouth ballot bang
+barrack baste bastinado batfowl bawl beggar beguile belie bemean bequeath
+berth betroth biff bilge birr birth blackjack blouse bluepencil bluff blunge
+bobol bogie bone boomerang bootlick bowl bowse boycott braille brawl
+briquette browse buckram bulge bulletin burke bushwhack butt buzz cagmag
+calendar callous callus canoe capriole carouse caseate castoff caucus cellar
+cense censor cere chafe chaff chagrin challenge chamois chandelle chirrup
+chorus chrome chuff churr cite clang clean cleanse coauthor coff cohere
+collar combat commune compere compete complete concrete condense condone
+cone constringe contango contravene convene convulse corrival cosponsor
+counterproposal cowl crawl create crescendo crevasse cringe crossruff cuff
+curette cutback daff damascene debus debut decal delete delineate delouse
+demean deplete depone derrick despite dethrone develop devil diadem die disc
+dispense dissuade distaste disunite divulge doctor doff dome douche douse
+dowse drawl drone dropkick drowse dryclean duff dye dynamite earth echo egg
+embargo embus enquire enthrone enucleate envelop enwreath escallop espouse
+esquire euchre evite excite excrete expedite expense expunge extradite
+factor faff fete fife fillip finesse fizz flense flite fluff foretaste
+fortune fossick fowl fringe fritt frizz froth fuzz gaff gallop gang gangrene
+garrotte gazette gie gimme girth glean gollop goose goosestep grouse growl
+guide gumshoe hallal handcuff handpick haste hawse hector heel-and-toe
+herringbone heterodyne hiccup hie hijack hinge hocus hogtie holystone home
+hone honor hookup horde horseshoe hotdog house howl huff ideate ignite
+impaste imperil impinge importune incense incite indite indulge inearth
+infringe ingot inhere inquire insphere interfere intervene intone invalid
+invite item jampack jazz kite knife larrup lath license lollop loose lounge
+luff lunge maffick major margin martyr metal mete mewl miff mirror miscreate
+misdemean misguide misquote monitor mortar motor mouse mouth muff murdabad
+murmur muzz nauseate nucleate obsolete ochre ok orphan out-herod outvie
+overawe overdevelop overindulge overpersuade overstaff overstuff owe pal
+parrot paste pedal pee permeate persevere persuade phone pickaxe pigstick
+pillar pilot pinprick pipette pirouette pith pivot placekick playback plunge
+politick postil postpone poussette precis pressgang procreate prowl prune
+psyche pubcrawl puff pulse purr putt pyramid quake radiotelephone ransack
+ravin razz re-echo rebuff recap recite recompense recreate redevelop rehouse
+reignite rein rendezvous replevin repone repulse require requite reroute
+resin respite reunite revenge revere riff rinse rollick rone roose rosin
+roughhouse rouse route ruff ruin scallop scandal scavenge scissor sclaff
+scoff scollop scowl scrawl scrounge scuff scunge secrete seise sendoff sense
+sepulchre sere shanghai sheath shirr shred shroff sic sidetrack silhouette
+site sjambok skirr skite skyjack slang sleuth sluff smooth sned sniff
+snowshoe snuff souse spite sponge sponsor spouse sprawl spring-clean square
+squire staff stang stereochrome stone strafe stravaig stuff subvene sugar
+superadd supervene swarth sync syrup tabu tailor tango tariff taste tawse
+tee telephone tense throne throwback tie tiff tiptoe toboggan toe tone tooth
+trapan trawl trellis troupe tune tutor twang twinge underdevelop underquote
+unearth unhinge unite unpack unpick unquote unsphere unthrone untie unyoke
+up-anchor uprouse vamoose vector vein venge veto vie vignette vinegar visor
+vizor vouchsafe waff wainscot wallop warehouse waste waterski wawl wean
+welcome whang whiff whinge whistlestop white whizz wis wisecrack woman worth
+yawl yean yoke yowl zero zindabad zone zugzwang
+"""
+
+for _lemma in verb_regular.split():
+    for _form in find_lexeme(_lemma):
+        verb_lemmas.setdefault(_form, _lemma)
+del _lemma, _form
+
+
+def lemma(verb):
+    """Returns the infinitive of the given verb: was => be."""
+    v = verb.lower()
+    return verb_lemmas.get(v) or find_lemma(v)
+
+
+def lexeme(verb):
+    """Returns the forms of the given verb, see verb_be for their order."""
+    b = lemma(verb)
+    return verb_lexemes.get(b) or find_lexeme(b)
+
+
+def _lexeme_index(tense, person, number):
+    if tense not in verb_tenses:
+        raise ValueError("unknown tense: %r" % (tense,))
+    tense = verb_tenses[tense]
+    plural = number in (PLURAL, PL, "pl")
+    if tense == INFINITIVE:
+        return 0
+    if tense == PARTICIPLE:
+        return 5
+    if tense == PAST_PARTICIPLE:
+        return 11
+    if tense == PRESENT:
+        return 4 if plural or person not in (1, 2, 3) else person
+    return 9 if plural else 10 if person not in (1, 2, 3) else 5 + person
+
+
+@_memoize()
+def conjugate(verb, tense=INFINITIVE, person=3, number=SINGULAR):
+    """Returns the verb inflected for the given tense, person and number:
+    conjugate("am", PAST, 1, SINGULAR) => "was"."""
+    return lexeme(verb)[_lexeme_index(tense, person, number)]
+
+
 #### COMPARATIVE & SUPERLATIVE ###########################################
 
 VOWELS = "aeiouy"
@@ -626,20 +1351,15 @@ COMPARATIVE = "er"
 SUPERLATIVE = "est"
 
 
-def _count_syllables(word):
-    """ Returns the estimated number of syllables in the word by counting vowel-groups.
-    """
-    n = 0
-    p = False  # True if the previous character was a vowel.
-    for ch in word.endswith("e") and word[:-1] or word:
-        v = ch in VOWELS
-        n += int(v and not p)
-        p = v
-    return n
-
-
+@_memoize()
 def grade(adjective, suffix=COMPARATIVE):
     """Returns the comparative or superlative form of the given adjective."""
+    if suffix in (COMPARATIVE, SUPERLATIVE):
+        graded = _precomputed(adjective, suffix == COMPARATIVE and
+                              inflect_table.COMPARATIVE or
+                              inflect_table.SUPERLATIVE)
+        if graded is not None:
+            return graded
     n = _count_syllables(adjective)
     if adjective in grade_irregular:
         # A number of adjectives inflect irregularly.
@@ -690,6 +1410,52 @@ def predicative(adjective):
     return adjective
 
 
+#### BULK ################################################################
+# Inflect whole vocabularies at once. Duplicates are only inflected once
+# and large inputs can be sharded over a pool of processes.
+
+# Inputs with less unique words than this are never sent to a process pool.
+PARALLEL_MIN_WORDS = 10000
+
+
+def _inflect_many(function, words, n_jobs=1, chunksize=None, **kwargs):
+    is_array = hasattr(words, "ravel")  # numpy string arrays
+    values = words.ravel().tolist() if is_array else list(words)
+    unique = list(dict.fromkeys(values))
+    inflect = partial(function, **kwargs)
+    n_jobs = n_jobs if n_jobs and n_jobs > 0 else cpu_count() or 1
+    if n_jobs > 1 and len(unique) >= PARALLEL_MIN_WORDS:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = chunksize or max(1, len(unique) // (n_jobs * 4))
+        with ProcessPoolExecutor(n_jobs) as pool:
+            inflected = list(pool.map(inflect, unique, chunksize=chunksize))
+    else:
+        inflected = [inflect(w) for w in unique]
+    inflected = dict(zip(unique, inflected))
+    result = [inflected[w] for w in values]
+    if is_array:
+        import numpy
+        return numpy.array(result).reshape(words.shape)
+    return result
+
+
+def pluralize_many(words, pos=NOUN, custom=None, classical=True, n_jobs=1,
+                   chunksize=None):
+    """Returns the plural of each word, aligned with the given sequence
+    (or NumPy string array, in which case an array is returned).
+    With n_jobs > 1 (or None for all cores) large inputs are inflected in
+    a pool of processes, in chunks of chunksize words.
+    """
+    return _inflect_many(pluralize, words, n_jobs, chunksize, pos=pos,
+                         custom=custom, classical=classical)
+
+
+def singularize_many(words, pos=NOUN, custom=None, n_jobs=1, chunksize=None):
+    """Returns the singular of each word, see pluralize_many()."""
+    return _inflect_many(singularize, words, n_jobs, chunksize, pos=pos,
+                         custom=custom)
+
+
 if __name__ == "__main__":
     assert singularize("dogs") == "dog"
     assert pluralize("dog") == "dogs"
@@ -697,4 +1463,27 @@ if __name__ == "__main__":
     assert indefinite_article("dog") == "a"
     assert indefinite_article("airplane") == "an"
     assert comparative("ugly") == "uglier"
-    assert superlative("ugly") == "ugliest"
\ No newline at end of file
+    assert superlative("ugly") == "ugliest"
+    assert pluralize("dog", custom={"dog": "hounds"}) == "hounds"
+    assert cache_info()["pluralize"]["hits"] == 0
+    assert pluralize("dog") == "dogs"
+    assert cache_info()["pluralize"]["hits"] == 1
+    assert pluralize_many(["dog", "child", "dog"]) == ["dogs", "children", "dogs"]
+    assert singularize_many(("dogs", "children")) == ["dog", "child"]
+    assert conjugate("am", PAST, 1, SINGULAR) == "was"
+    assert conjugate("am", INFINITIVE) == "be"
+    assert conjugate("made", PRESENT, 3, SINGULAR) == "makes"
+    assert conjugate("walk", PAST, 3, PLURAL) == "walked"
+    assert conjugate("stop", PARTICIPLE) == "stopping"
+    assert lemma("carried") == "carry"
+    # Regular base forms that look inflected are their own lemma.
+    assert conjugate("need", PAST) == "needed"
+    assert conjugate("need", PRESENT, 3) == "needs"
+    assert conjugate("pass", PRESENT, 3) == "passes"
+    assert conjugate("discuss", PAST) == "discussed"
+    assert conjugate("focus", PAST) == "focused"
+    assert conjugate("guess", PAST) == "guessed"
+    assert conjugate("proceed", PAST) == "proceeded"
+    assert conjugate("proceed", PARTICIPLE) == "proceeding"
+    assert conjugate("embed", PRESENT, 3) == "embeds"
+    assert lemma("agreed") == "agree" and lemma("passes") == "pass"
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Precomputed inflections for a known vocabulary.
+
+The plural, singular, comparative and superlative of every word are
+computed once with the rules in TexTor.understand.inflect and written to a
+compact binary table. At runtime the table is memory-mapped, known words
+are found with a hash lookup and nothing is parsed up front.
+
+Layout, all integers are little endian uint32:
+    magic b"TXIF", version, number of words n, number of hash slots m
+    m hash slots, each 0 (empty) or the index + 1 of a record
+    n + 1 record offsets, relative to the start of the records
+    records sorted by word, "word\\tplural\\tsingular\\tcomparative\\tsuperlative"
+    encoded as utf-8
+
+Words are hashed with crc32 and collisions are resolved by linear probing.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from os.path import exists
+from zlib import crc32
+
+from TexTor.settings import INFLECTIONS_PATH
+
+MAGIC = b"TXIF"
+VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+
+# Field order of each record, after the word itself.
+PLURAL, SINGULAR, COMPARATIVE, SUPERLATIVE = 0, 1, 2, 3
+
+
+def _uint32s(buffer, start, count):
+    """A zero-copy view of count little endian uint32 at start."""
+    if sys.byteorder == "little":
+        return memoryview(buffer)[start:start + 4 * count].cast("I")
+    values = array("I", buffer[start:start + 4 * count])
+    values.byteswap()
+    return values
+
+
+class InflectionTable(object):
+    def __init__(self, path=INFLECTIONS_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, n_slots = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not an inflection table: " + path)
+        self._mask = n_slots - 1
+        self._slots = _uint32s(self._mm, _HEADER.size, n_slots)
+        start = _HEADER.size + 4 * n_slots
+        self._offsets = _uint32s(self._mm, start, self.size + 1)
+        self._records = start + 4 * (self.size + 1)
+
+    def get(self, word):
+        """Returns the (plural, singular, comparative, superlative) of the
+        word, or None if the word is not in the table."""
+        key = word.encode("utf-8")
+        h = crc32(key) & self._mask
+        while True:
+            i = self._slots[h]
+            if not i:
+                return None
+            start = self._records + self._offsets[i - 1]
+            end = self._records + self._offsets[i]
+            if self._mm[start:start + len(key) + 1] == key + b"\t":
+                return tuple(self._mm[start + len(key) + 1:end]
+                             .decode("utf-8").split("\t"))
+            h = (h + 1) & self._mask
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        self._slots.release()
+        self._offsets.release()
+        self._mm.close()
+
+
+def load_inflection_table(path=INFLECTIONS_PATH):
+    """Returns the memory-mapped table, or None if it was not built yet."""
+    if not exists(path):
+        return None
+    return InflectionTable(path)
+
+
+def build_inflection_table(words=None, path=INFLECTIONS_PATH):
+    """Precomputes the inflections of the given vocabulary, the words of the
+    bundled emotion lexicon by default, and writes them to path."""
+    from TexTor.understand import inflect
+    if words is None:
+        from TexTor.lexicons import LEXICON
+        words = LEXICON
+    words = sorted(set(w for w in words if w and "\t" not in w),
+                   key=lambda w: w.encode("utf-8"))
+    # The table must hold what the rules say, not what an older table says.
+    previous = inflect.set_inflection_table(False)
+    try:
+        records = ["\t".join((word,
+                              inflect.pluralize(word),
+                              inflect.singularize(word),
+                              inflect.comparative(word),
+                              inflect.superlative(word))).encode("utf-8")
+                   for word in words]
+    finally:
+        inflect.set_inflection_table(previous)
+
+    offsets, position = array("I"), 0
+    for record in records:
+        offsets.append(position)
+        position += len(record)
+    offsets.append(position)
+
+    n_slots = 1
+    while n_slots < 2 * len(records):
+        n_slots *= 2
+    slots = array("I", [0] * n_slots)
+    for i, word in enumerate(words):
+        h = crc32(word.encode("utf-8")) & (n_slots - 1)
+        while slots[h]:
+            h = (h + 1) & (n_slots - 1)
+        slots[h] = i + 1
+
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        slots.byteswap()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(records), n_slots))
+        f.write(slots.tobytes())
+        f.write(offsets.tobytes())
+        f.write(b"".join(records))
+    os.replace(tmp, path)
+    # Open the new table on the next lookup.
+    inflect.set_inflection_table(None)
+    return len(records)
+
+
+if __name__ == "__main__":
+    print(build_inflection_table(), "words written to", INFLECTIONS_PATH)
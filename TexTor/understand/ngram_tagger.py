@@ -0,0 +1,463 @@
+"""Compact n-gram part of speech tagger.
+
+Holds the same model as the NLTK backoff chain SentenceTagger is trained
+with (Trigram -> Bigram -> Unigram -> Regexp) and gives the same tags, but
+it is memory-mapped instead of unpickled. Words and tags are interned to
+integer ids and every n-gram table is a pair of sorted arrays, so loading
+is a few slices and the pages are shared by all processes using the file.
+
+Layout, all integers are little endian:
+    magic b"TXNG", version, length of the metadata (4s, uint32, uint32)
+    metadata, utf-8 json with the tags, the stages of the backoff chain,
+    the number of words and of word hash slots
+    for every n-gram stage, in order
+        unigram     uint16 tag of every word id
+        bigram+     hash slots, uint64 keys then uint16 tags
+    uint32 word hash slots, 0 (empty) or the word id + 1
+    n + 1 uint32 word offsets, relative to the start of the words
+    the words, sorted and encoded as utf-8
+Every array starts at a multiple of 8.
+
+A key packs the word id with the tags before it, the most recent tag in
+the lowest 16 bits. Tags are stored as their id + 1, 0 stands for no entry
+(an empty slot) and for the history missing at the start of a sentence.
+Keys are placed by Fibonacci hashing, words are hashed with crc32, and
+collisions are resolved by linear probing in both cases.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from pickle import load
+from zlib import crc32
+
+MAGIC = b"TXNG"
+VERSION = 1
+_HEADER = struct.Struct("<4sII")
+MAX_ORDER = 3  # word id (32 bits) and two tags (16 bits each) in 64 bits
+_GOLDEN = 0x9E3779B97F4A7C15
+# Words seen by a tagger keep their id in memory, up to this many.
+WORD_CACHE_SIZE = 1 << 16
+
+
+def _view(buffer, start, typecode, count):
+    """A zero-copy view of count little endian integers at start."""
+    size = array(typecode).itemsize
+    if sys.byteorder == "little":
+        return memoryview(buffer)[start:start + size * count].cast(typecode)
+    values = array(typecode, buffer[start:start + size * count])
+    values.byteswap()
+    return values
+
+
+def _aligned(position):
+    return (position + 7) & ~7
+
+
+def _pack(word_id, history, n):
+    """Key of a word with the (up to n - 1) tag ids before it."""
+    key = 0
+    for tag_id in history:
+        key = key << 16 | tag_id + 1
+    return word_id << 16 * (n - 1) | key
+
+
+def _n_slots(size):
+    """Power of two number of hash slots, at most half of them used."""
+    bits = 1
+    while 1 << bits < 2 * size:
+        bits += 1
+    return 1 << bits, 64 - bits
+
+
+class CompactTagger(object):
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, meta_size = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a compact tagger: " + path)
+        start = _HEADER.size
+        meta = json.loads(self._mm[start:start + meta_size].decode("utf-8"))
+        position = _aligned(start + meta_size)
+
+        self.tags = meta["tags"]
+        tag_ids = {tag: i for i, tag in enumerate(self.tags)}
+        n_words = meta["words"]
+        self._views = []
+        self._stages = []
+        for stage in meta["stages"]:
+            kind = stage["kind"]
+            if kind == "ngram" and stage["n"] == 1:
+                tags = _view(self._mm, position, "H", n_words)
+                position = _aligned(position + 2 * n_words)
+                self._views.append(tags)
+                self._stages.append((kind, 1, tags, None, 0))
+            elif kind == "ngram":
+                n_slots = stage["slots"]
+                keys = _view(self._mm, position, "Q", n_slots)
+                position = _aligned(position + 8 * n_slots)
+                tags = _view(self._mm, position, "H", n_slots)
+                position = _aligned(position + 2 * n_slots)
+                self._views.extend((keys, tags))
+                self._stages.append((kind, stage["n"], keys, tags,
+                                     _n_slots(n_slots // 2)[1]))
+            elif kind == "regexp":
+                self._stages.append((kind, 0, [
+                    (re.compile(pattern, flags), tag_ids[tag])
+                    for pattern, flags, tag in stage["regexps"]], None, 0))
+            else:
+                self._stages.append((kind, 0, tag_ids[stage["tag"]], None, 0))
+
+        self.size = n_words
+        self._mask = meta["slots"] - 1
+        self._slots = _view(self._mm, position, "I", meta["slots"])
+        position = _aligned(position + 4 * meta["slots"])
+        self._offsets = _view(self._mm, position, "I", n_words + 1)
+        self._words = position + 4 * (n_words + 1)
+        self._views.extend((self._slots, self._offsets))
+        self._word_ids = {}
+
+    def word_id(self, word):
+        """The id of a word, or -1 if the model has never seen it."""
+        i = self._word_ids.get(word)
+        if i is None:
+            if len(self._word_ids) >= WORD_CACHE_SIZE:
+                self._word_ids.clear()
+            i = self._word_ids[word] = self._find_word(word)
+        return i
+
+    def _find_word(self, word):
+        key = word.encode("utf-8")
+        h = crc32(key) & self._mask
+        while True:
+            i = self._slots[h]
+            if not i:
+                return -1
+            start = self._words + self._offsets[i - 1]
+            end = self._words + self._offsets[i]
+            if end - start == len(key) and self._mm[start:end] == key:
+                return i - 1
+            h = (h + 1) & self._mask
+
+    def tag(self, tokens):
+        """Returns a list of (word, tag) tuples, like nltk taggers."""
+        word_id, stages = self.word_id, self._stages
+        history = []
+        # tag ids + 1 of the two previous words, 0 at the start
+        prev1 = prev2 = 0
+        for word in tokens:
+            i = word_id(word)
+            tag = 0  # tags[0] is None, nothing matched
+            for kind, n, first, second, shift in stages:
+                if kind == "ngram":
+                    if i < 0:
+                        continue
+                    if n == 1:
+                        if first[i]:
+                            tag = first[i] - 1
+                            break
+                        continue
+                    # _pack inlined for bigrams and trigrams
+                    key = i << 16 * (n - 1) | prev1
+                    if n == 3:
+                        key |= prev2 << 16
+                    mask = len(first) - 1
+                    j = (key * _GOLDEN >> shift) & mask
+                    while second[j]:
+                        if first[j] == key:
+                            break
+                        j = (j + 1) & mask
+                    if second[j]:
+                        tag = second[j] - 1
+                        break
+                elif kind == "regexp":
+                    for regexp, tag_id in first:
+                        if regexp.match(word):
+                            tag = tag_id
+                            break
+                    else:
+                        continue
+                    break
+                else:
+                    tag = first
+                    break
+            history.append(tag)
+            prev1, prev2 = tag + 1, prev1
+        tags = self.tags
+        return [(word, tags[i]) for word, i in zip(tokens, history)]
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        for view in self._views:
+            if isinstance(view, memoryview):
+                view.release()
+        self._mm.close()
+
+
+def _regexps(tagger):
+    """(pattern, flags, tag) of a RegexpTagger, older NLTK versions named
+    the attribute _regexs and newer ones wrap the patterns."""
+    regexps = getattr(tagger, "_regexps", None) or tagger._regexs
+    out = []
+    for regexp, tag in regexps:
+        regexp = getattr(regexp, "_rx", regexp)
+        if isinstance(regexp, str):
+            regexp = re.compile(regexp)
+        out.append((regexp.pattern, regexp.flags, tag))
+    return out
+
+
+def save_compact_tagger(tagger, path):
+    """Writes an NLTK backoff chain of n-gram (up to trigram), regexp and
+    default taggers to path in the compact format."""
+    import nltk
+    stages, tables = [], []
+    for t in tagger._taggers:
+        if isinstance(t, nltk.UnigramTagger):
+            stages.append({"kind": "ngram", "n": 1})
+            tables.append({((), word): tag
+                           for word, tag in t._context_to_tag.items()})
+        elif isinstance(t, nltk.NgramTagger) and t._n <= MAX_ORDER:
+            stages.append({"kind": "ngram", "n": t._n})
+            tables.append(t._context_to_tag)
+        elif isinstance(t, nltk.RegexpTagger):
+            stages.append({"kind": "regexp", "regexps": _regexps(t)})
+        elif isinstance(t, nltk.DefaultTagger):
+            stages.append({"kind": "default", "tag": t._tag})
+        else:
+            raise ValueError("can not compact " + repr(t))
+
+    tags = [None]
+    for stage in stages:
+        tags.extend(r[2] for r in stage.get("regexps", ()))
+        if "tag" in stage:
+            tags.append(stage["tag"])
+    for table in tables:
+        for (history, word), tag in table.items():
+            tags.append(tag)
+            tags.extend(history)
+    tags = [None] + sorted(set(t for t in tags if t is not None))
+    if len(tags) >= 0xFFFF:
+        raise ValueError("too many tags")
+    tag_ids = {tag: i for i, tag in enumerate(tags)}
+
+    words = sorted(set(word for table in tables for _, word in table),
+                   key=lambda w: w.encode("utf-8"))
+    word_ids = {word: i for i, word in enumerate(words)}
+
+    arrays = []
+    tables = iter(tables)
+    for stage in stages:
+        if stage["kind"] != "ngram":
+            continue
+        n, table = stage["n"], next(tables)
+        if n == 1:
+            unigram = array("H", [0] * len(words))
+            for (_, word), tag in table.items():
+                unigram[word_ids[word]] = tag_ids[tag] + 1
+            arrays.append(unigram)
+            continue
+        n_slots, shift = _n_slots(len(table))
+        keys = array("Q", [0] * n_slots)
+        values = array("H", [0] * n_slots)
+        for (history, word), tag in table.items():
+            key = _pack(word_ids[word], [tag_ids[h] for h in history], n)
+            h = (key * _GOLDEN >> shift) & (n_slots - 1)
+            while values[h]:
+                h = (h + 1) & (n_slots - 1)
+            keys[h], values[h] = key, tag_ids[tag] + 1
+        stage["slots"] = n_slots
+        arrays.extend((keys, values))
+
+    encoded = [w.encode("utf-8") for w in words]
+    offsets, position = array("I"), 0
+    for word in encoded:
+        offsets.append(position)
+        position += len(word)
+    offsets.append(position)
+    n_slots = 1
+    while n_slots < 2 * len(words):
+        n_slots *= 2
+    slots = array("I", [0] * n_slots)
+    for i, word in enumerate(encoded):
+        h = crc32(word) & (n_slots - 1)
+        while slots[h]:
+            h = (h + 1) & (n_slots - 1)
+        slots[h] = i + 1
+    arrays.extend((slots, offsets))
+
+    meta = json.dumps({"tags": tags, "stages": stages, "words": len(words),
+                       "slots": n_slots}).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(meta)))
+        f.write(meta)
+        for values in arrays:
+            f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            if sys.byteorder != "little":
+                values.byteswap()
+            f.write(values.tobytes())
+        f.write(b"".join(encoded))
+    os.replace(tmp, path)
+    return path
+
+
+def read_tagged_corpus(path, sep="/", encoding="utf-8"):
+    """Streams the sentences of a tagged corpus, one sentence per line of
+    word/TAG tokens (the format of the brown corpus files), as lists of
+    (word, tag) tuples."""
+    with open(path, encoding=encoding) as f:
+        for line in f:
+            sentence = [tuple(token.rsplit(sep, 1)) for token in line.split()]
+            if sentence:
+                yield sentence
+
+
+def _shards(sentences, size):
+    shard = []
+    for sentence in sentences:
+        shard.append(sentence)
+        if len(shard) == size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def _count_shard(sentences, max_order=MAX_ORDER):
+    """Counts the tags seen in every n-gram context of the sentences, keyed
+    by (order, context, tag). Contexts are the ones of nltk taggers, the
+    word for unigrams and (previous tags, word) for longer n-grams."""
+    counts = {}
+    tokens = 0
+    for sentence in sentences:
+        tags = [tag for _, tag in sentence]
+        tokens += len(sentence)
+        for i, (word, tag) in enumerate(sentence):
+            key = (1, word, tag)
+            counts[key] = counts.get(key, 0) + 1
+            for n in range(2, max_order + 1):
+                key = (n, (tuple(tags[max(0, i - n + 1):i]), word), tag)
+                counts[key] = counts.get(key, 0) + 1
+    return counts, len(sentences), tokens
+
+
+def _build_table(counts, n, backoff):
+    """The context -> tag table of an nltk n-gram tagger trained with
+    cutoff 0: the most frequent tag of each context (the first seen on a
+    tie), only for contexts the backoff tags wrong at least once."""
+    best, useful = {}, set()
+    for (order, context, tag), count in counts.items():
+        if order != n:
+            continue
+        if context not in best or count > best[context][0]:
+            best[context] = (count, tag)
+        if context not in useful and backoff(context) != tag:
+            useful.add(context)
+    return {context: best[context][1] for context in useful}
+
+
+def _backoff(tables, regexps):
+    """What the chain of the tables trained so far says in a context,
+    which always holds the word and all history the chain needs."""
+    def tag(context):
+        history, word = context if isinstance(context, tuple) else ((), context)
+        for n in range(len(tables), 0, -1):
+            key = word if n == 1 else \
+                (history[max(0, len(history) - n + 1):], word)
+            if key in tables[n - 1]:
+                return tables[n - 1][key]
+        for regexp, regexp_tag in regexps:
+            if regexp.match(word):
+                return regexp_tag
+        return None
+    return tag
+
+
+def train_ngram_tagger(sentences, regexps=(), max_order=MAX_ORDER, n_jobs=1,
+                       shard_size=2000, progress=None):
+    """Trains the same backoff chain as nltk (regexp, unigram, bigram and
+    trigram taggers up to max_order, cutoff 0) in a single pass over
+    sentences, an iterable of (word, tag) lists that is never held in
+    memory. regexps are the (pattern, tag) rules of the last backoff.
+
+    The corpus is split into shards of shard_size sentences whose context
+    counts are merged in order, with n_jobs > 1 (or None for all cores)
+    shards are counted in a pool of processes. progress, if given, is
+    called with the name of each stage and a dict of its counters and
+    elapsed seconds.
+    Returns an nltk tagger.
+    """
+    import nltk
+    from collections import deque
+    from time import perf_counter
+    report = progress or (lambda stage, info: None)
+    n_jobs = n_jobs if n_jobs and n_jobs > 0 else os.cpu_count() or 1
+
+    start = perf_counter()
+    counts, n_sentences, n_tokens = {}, 0, 0
+
+    def merge(result):
+        nonlocal n_sentences, n_tokens
+        shard_counts, shard_sentences, shard_tokens = result
+        for key, count in shard_counts.items():
+            counts[key] = counts.get(key, 0) + count
+        n_sentences += shard_sentences
+        n_tokens += shard_tokens
+        report("count", {"sentences": n_sentences, "tokens": n_tokens,
+                         "seconds": perf_counter() - start})
+
+    shards = _shards(sentences, shard_size)
+    if n_jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(n_jobs) as pool:
+            # a few shards in flight per worker, merged in corpus order
+            pending = deque()
+            for shard in shards:
+                pending.append(pool.submit(_count_shard, shard, max_order))
+                if len(pending) >= 2 * n_jobs:
+                    merge(pending.popleft().result())
+            while pending:
+                merge(pending.popleft().result())
+    else:
+        for shard in shards:
+            merge(_count_shard(shard, max_order))
+
+    tagger = nltk.RegexpTagger(list(regexps)) if regexps else None
+    regexps = [(re.compile(pattern), tag) for pattern, tag in regexps]
+    classes = {1: nltk.UnigramTagger, 2: nltk.BigramTagger,
+               3: nltk.TrigramTagger}
+    tables = []
+    for n in range(1, max_order + 1):
+        start = perf_counter()
+        table = _build_table(counts, n, _backoff(tables, regexps))
+        tables.append(table)
+        if table:
+            tagger = classes[n](model=table, backoff=tagger)
+        report(classes[n].__name__, {"contexts": len(table),
+                                     "seconds": perf_counter() - start})
+    return tagger
+
+
+def load_tagger(path):
+    """Opens a compact tagger, or unpickles an NLTK tagger saved by older
+    versions of TexTor."""
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return CompactTagger(path)
+    with open(path, "rb") as f:
+        return load(f)
+
+
+if __name__ == "__main__":
+    # python -m TexTor.understand.ngram_tagger tagger.pkl tagger.bin
+    tagger = load_tagger(sys.argv[1])
+    print("written to", save_compact_tagger(tagger, sys.argv[2]))
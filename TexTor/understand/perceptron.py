@@ -0,0 +1,257 @@
+"""Averaged perceptron part of speech tagger.
+
+A greedy left to right tagger in the style of "A good part-of-speech
+tagger in about 200 lines of Python" (Matthew Honnibal). It generalizes
+to unseen contexts from word shape, affixes and neighbours, where the
+n-gram tagger can only back off to a few regular expressions.
+
+Features are hashed with crc32 into N_FEATURES rows and the averaged
+weights are stored sparse, row by row (CSR), in a small .npz file. The
+features that do not depend on previous tags are scored for a whole
+sentence at once with a few NumPy gathers, only the tag history features
+are added word by word.
+"""
+import random
+from time import perf_counter
+from zlib import crc32
+
+import numpy as np
+
+N_FEATURES = 1 << 18
+START = ("-START-", "-START2-")
+END = ("-END-", "-END2-")
+# Unambiguous frequent words are tagged without scoring.
+TAGDICT_MIN_COUNT = 20
+TAGDICT_MIN_RATIO = 0.97
+
+
+def _hash(feature):
+    return crc32(feature.encode("utf-8")) & (N_FEATURES - 1)
+
+
+def _normalize(word):
+    if "-" in word and word[0] != "-":
+        return "!HYPHEN"
+    if word.isdigit() and len(word) == 4:
+        return "!YEAR"
+    if word[:1].isdigit():
+        return "!DIGITS"
+    return word.lower()
+
+
+def _shape(word):
+    if word.isupper():
+        return "XX"
+    if word[:1].isupper():
+        return "Xx"
+    if word[:1].isdigit():
+        return "d"
+    return "x"
+
+
+def _static_features(words):
+    """Ids of the features of every word that do not depend on the tags,
+    an array of shape (len(words), number of features)."""
+    context = START + tuple(_normalize(w) for w in words) + END
+    features = []
+    for i, word in enumerate(words):
+        c = i + 2
+        features.append([_hash(f) for f in (
+            "bias",
+            "i suffix " + context[c][-3:],
+            "i pref1 " + context[c][:1],
+            "i shape " + _shape(word),
+            "i word " + context[c],
+            "i-1 word " + context[c - 1],
+            "i-1 suffix " + context[c - 1][-3:],
+            "i-2 word " + context[c - 2],
+            "i+1 word " + context[c + 1],
+            "i+1 suffix " + context[c + 1][-3:],
+            "i+2 word " + context[c + 2])])
+    return np.array(features, dtype=np.int64).reshape(len(words), -1)
+
+
+def _tag_features(word, prev, prev2):
+    """Ids of the features of a word that depend on the previous tags."""
+    word = _normalize(word)
+    return [_hash("i-1 tag " + prev),
+            _hash("i-2 tag " + prev2),
+            _hash("i tag+i-2 tag " + prev + " " + prev2),
+            _hash("i-1 tag+i word " + prev + " " + word)]
+
+
+class PerceptronTagger(object):
+    def __init__(self, path=None, model=None):
+        """Loads a model saved with save(), or takes the arrays of one."""
+        if model is None:
+            with np.load(path, allow_pickle=False) as data:
+                model = {key: data[key] for key in data.files}
+        self.path = path
+        self.tags = [str(tag) for tag in model["tags"]]
+        self._indptr = model["indptr"]
+        self._tag_ids = model["tag_ids"]
+        self._weights = model["weights"]
+        self.tagdict = dict(zip((str(w) for w in model["tagdict_words"]),
+                                model["tagdict_tags"].tolist()))
+
+    def _static_scores(self, words):
+        """(len(words), number of tags) scores of the static features."""
+        ids = _static_features(words).ravel()
+        starts = self._indptr[ids]
+        counts = self._indptr[ids + 1] - starts
+        total = int(counts.sum())
+        # position of every non zero weight of the gathered rows
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + \
+            np.arange(total)
+        rows = np.repeat(np.repeat(np.arange(len(words)),
+                                   len(ids) // max(len(words), 1)), counts)
+        n_tags = len(self.tags)
+        # bincount of no weights at all is int64, tag() adds floats to it
+        return np.bincount(rows * n_tags + self._tag_ids[offsets],
+                           weights=self._weights[offsets],
+                           minlength=len(words) * n_tags
+                           ).astype(np.float64).reshape(len(words), n_tags)
+
+    def tag(self, tokens):
+        """Returns a list of (word, tag) tuples, like nltk taggers."""
+        tokens = list(tokens)
+        if not tokens:
+            return []
+        scores = self._static_scores(tokens)
+        indptr, tag_ids, weights = self._indptr, self._tag_ids, self._weights
+        prev, prev2 = START
+        tags = []
+        for i, word in enumerate(tokens):
+            tag = self.tagdict.get(word)
+            if tag is None:
+                s = scores[i]
+                for f in _tag_features(word, prev, prev2):
+                    a, b = indptr[f], indptr[f + 1]
+                    s[tag_ids[a:b]] += weights[a:b]
+                tag = int(s.argmax())
+            tags.append(self.tags[tag])
+            prev2, prev = prev, self.tags[tag]
+        return list(zip(tokens, tags))
+
+    def save(self, path):
+        # through a file, np.savez would add .npz to any other path
+        with open(path, "wb") as f:
+            np.savez(f, tags=np.array(self.tags), indptr=self._indptr,
+                     tag_ids=self._tag_ids, weights=self._weights,
+                     tagdict_words=np.array(list(self.tagdict), dtype=str),
+                     tagdict_tags=np.array(list(self.tagdict.values()),
+                                           dtype=np.uint16))
+        self.path = path
+        return path
+
+
+class _AveragedPerceptron(object):
+    """Sparse training weights, feature id -> {tag id: weight}, averaged
+    over every update as in Collins (2002)."""
+
+    def __init__(self, n_tags):
+        self.n_tags = n_tags
+        self.weights = {}
+        self._totals = {}
+        self._stamps = {}
+        self.i = 0
+
+    def score(self, features, scores):
+        for f in features:
+            for tag, weight in self.weights.get(f, {}).items():
+                scores[tag] += weight
+        return scores
+
+    def update(self, truth, guess, features):
+        self.i += 1
+        if truth == guess:
+            return
+        for f in features:
+            row = self.weights.setdefault(f, {})
+            for tag, delta in ((truth, 1.0), (guess, -1.0)):
+                key = (f, tag)
+                weight = row.get(tag, 0.0)
+                self._totals[key] = self._totals.get(key, 0.0) + \
+                    (self.i - self._stamps.get(key, 0)) * weight
+                self._stamps[key] = self.i
+                row[tag] = weight + delta
+
+    def averaged_csr(self):
+        """indptr, tag ids and weights of the averaged non zero weights."""
+        counts = np.zeros(N_FEATURES + 1, dtype=np.int64)
+        entries = []
+        for f, row in self.weights.items():
+            for tag, weight in row.items():
+                key = (f, tag)
+                total = self._totals.get(key, 0.0) + \
+                    (self.i - self._stamps.get(key, 0)) * weight
+                average = total / max(self.i, 1)
+                if average:
+                    entries.append((f, tag, average))
+                    counts[f + 1] += 1
+        entries.sort()
+        indptr = np.cumsum(counts).astype(np.int64)
+        tag_ids = np.array([e[1] for e in entries], dtype=np.uint16)
+        weights = np.array([e[2] for e in entries], dtype=np.float32)
+        return indptr, tag_ids, weights
+
+
+def train_perceptron(sentences, n_iter=5, seed=0, progress=None):
+    """Trains a PerceptronTagger on a list of (word, tag) lists, in n_iter
+    shuffled passes. progress, if given, is called after each pass with
+    its name and a dict with the accuracy on the training data and the
+    elapsed seconds."""
+    sentences = [list(s) for s in sentences if s]
+    report = progress or (lambda stage, info: None)
+    counts = {}
+    for sentence in sentences:
+        for word, tag in sentence:
+            counts.setdefault(word, {})
+            counts[word][tag] = counts[word].get(tag, 0) + 1
+    tags = sorted(set(t for c in counts.values() for t in c))
+    tag_ids = {tag: i for i, tag in enumerate(tags)}
+    tagdict = {}
+    for word, c in counts.items():
+        tag, n = max(c.items(), key=lambda item: item[1])
+        total = sum(c.values())
+        if total >= TAGDICT_MIN_COUNT and n / total >= TAGDICT_MIN_RATIO:
+            tagdict[word] = tag_ids[tag]
+
+    model = _AveragedPerceptron(len(tags))
+    rng = random.Random(seed)
+    for iteration in range(n_iter):
+        start = perf_counter()
+        correct = total = 0
+        for sentence in sentences:
+            words = [w for w, _ in sentence]
+            static = _static_features(words).tolist()
+            prev, prev2 = START
+            for i, (word, tag) in enumerate(sentence):
+                guess = tagdict.get(word)
+                if guess is None:
+                    features = static[i] + _tag_features(word, prev, prev2)
+                    guess = int(np.argmax(model.score(
+                        features, np.zeros(len(tags)))))
+                    model.update(tag_ids[tag], guess, features)
+                prev2, prev = prev, tags[guess]
+                correct += guess == tag_ids[tag]
+                total += 1
+        rng.shuffle(sentences)
+        report("iteration %d" % (iteration + 1),
+               {"accuracy": correct / max(total, 1),
+                "seconds": perf_counter() - start})
+
+    indptr, weight_tags, weights = model.averaged_csr()
+    return PerceptronTagger(model={
+        "tags": np.array(tags), "indptr": indptr, "tag_ids": weight_tags,
+        "weights": weights,
+        "tagdict_words": np.array(list(tagdict), dtype=str),
+        "tagdict_tags": np.array(list(tagdict.values()), dtype=np.uint16)})
+
+
+if __name__ == "__main__":
+    # python -m TexTor.understand.perceptron, trains on the brown corpus
+    from nltk.corpus import brown
+    from TexTor.settings import PERCEPTRON_PATH
+    tagger = train_perceptron(brown.tagged_sents(), progress=print)
+    print("written to", tagger.save(PERCEPTRON_PATH))
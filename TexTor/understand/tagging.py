@@ -1,68 +1,145 @@
-import nltk
-from nltk.corpus import brown
-from itertools import dropwhile
+from itertools import islice
+import re
 import string
-from os.path import exists, join
-from pickle import dump, load
-from TexTor import get_nlp
-from TexTor.settings import MODELS_PATH
-from pattern.en import conjugate, PAST, PRESENT, SINGULAR, PLURAL
-from spacy.symbols import NOUN
+from os import cpu_count
+from os.path import exists
+from pickle import dump
+from TexTor import get_nlp, models
+from TexTor.cache import LRUCache
+from TexTor.settings import TAGGER_PATH, PERCEPTRON_PATH
+from TexTor.understand.inflect import conjugate, INFINITIVE, PRESENT, PAST, \
+    SINGULAR, PLURAL
+from TexTor.understand.ngram_tagger import load_tagger, save_compact_tagger, \
+    train_ngram_tagger
 
 SUBJ_DEPS = {'agent', 'csubj', 'csubjpass', 'expl', 'nsubj', 'nsubjpass'}
 
+# Batches with less unique sentences than this are never sent to a process
+# pool, starting the workers costs more than tagging them.
+PARALLEL_MIN_SENTENCES = 1000
+
+# Tagging engines and their default model.
+ENGINES = {"ngram": TAGGER_PATH, "perceptron": PERCEPTRON_PATH}
+
+# Last backoff of the trained tagger.
+# These regexes were lifted from the NLTK book tagger chapter.
+REGEXPS = [(r'^-?[0-9]+(.[0-9]+)?$', 'CD'),  # cardinal numbers
+           (r'(The|the|A|a|An|an)$', 'AT'),  # articles
+           (r'.*able$', 'JJ'),  # adjectives
+           (r'.*ness$', 'NN'),  # nouns formed from adjectives
+           (r'.*ly$', 'RB'),  # adverbs
+           (r'.*s$', 'NNS'),  # plural nouns
+           (r'.*ing$', 'VBG'),  # gerunds
+           (r'.*ed$', 'VBD'),  # past tense verbs
+           (r'.*', 'NN')  # nouns (default)
+           ]
+
 
 class SentenceTagger(object):
-    def __init__(self, model_path=None, nlp=None):
+    def __init__(self, model_path=None, nlp=None, cache_size=0,
+                 engine="ngram"):
+        """cache_size tagged sentences are kept, keyed by their tokens, so
+        repeated sentences are only tagged once (0 disables the cache).
+        engine is "ngram" (backoff n-gram tables) or "perceptron" (averaged
+        perceptron, better on unseen words and contexts, needs numpy).
+        No perceptron model ships with TexTor: when model_path does not
+        exist a model is trained from the Brown corpus in this process,
+        which takes minutes, and saved there for the next start. Train it
+        beforehand with python -m TexTor.understand.perceptron."""
+        if engine not in ENGINES:
+            raise ValueError("unknown engine: " + engine)
         self._nlp = nlp
-        self.model_path = model_path or join(MODELS_PATH, "tagger.pkl")
-        if exists(self.model_path):
-            with open(self.model_path, 'rb') as data:
-                tagger = load(data)
-            self.tagger = tagger
-        else:
-            tagger = self.train()
-            self.tagger = tagger
+        self.cache = LRUCache(cache_size)
+        self.engine = engine
+        self.model_path = model_path or ENGINES[engine]
+        if not exists(self.model_path):
+            self.tagger = self.train(engine=engine)
             self.save()
+        # the memory-mapped model instead of the nltk dicts
+        self.tagger = self.load(self.model_path, engine)
+
+    @staticmethod
+    def load(model_path, engine="ngram"):
+        if engine == "perceptron":
+            from TexTor.understand.perceptron import PerceptronTagger
+            return PerceptronTagger(model_path)
+        return load_tagger(model_path)
 
     @staticmethod
-    def train():
-        """Train a tagger from the Brown Corpus. This should not be called very
-        often; only in the event that the tagger pickle wasn't found."""
-        train_sents = brown.tagged_sents()
-
-        # These regexes were lifted from the NLTK book tagger chapter.
-        t0 = nltk.RegexpTagger(
-            [(r'^-?[0-9]+(.[0-9]+)?$', 'CD'),  # cardinal numbers
-             (r'(The|the|A|a|An|an)$', 'AT'),  # articles
-             (r'.*able$', 'JJ'),  # adjectives
-             (r'.*ness$', 'NN'),  # nouns formed from adjectives
-             (r'.*ly$', 'RB'),  # adverbs
-             (r'.*s$', 'NNS'),  # plural nouns
-             (r'.*ing$', 'VBG'),  # gerunds
-             (r'.*ed$', 'VBD'),  # past tense verbs
-             (r'.*', 'NN')  # nouns (default)
-             ])
-        t1 = nltk.UnigramTagger(train_sents, backoff=t0)
-        t2 = nltk.BigramTagger(train_sents, backoff=t1)
-        t3 = nltk.TrigramTagger(train_sents, backoff=t2)
-        return t3
+    def train(corpus=None, n_jobs=None, progress=None, engine="ngram"):
+        """Train a tagger from the Brown Corpus, or from corpus, an iterable of
+        (word, tag) lists such as read_tagged_corpus(path). This should not be
+        called very often; only in the event that the tagger model wasn't
+        found.
+        Context counts of the n-gram engine are sharded over n_jobs processes
+        (all cores by default), progress is called with each stage and its
+        timing."""
+        if corpus is None:
+            from nltk.corpus import brown
+            corpus = brown.tagged_sents()
+        if engine == "perceptron":
+            from TexTor.understand.perceptron import train_perceptron
+            return train_perceptron(corpus, progress=progress)
+        return train_ngram_tagger(corpus, REGEXPS, n_jobs=n_jobs,
+                                  progress=progress)
 
     def save(self):
-        with open(self.model_path, 'wb') as output:
-            dump(self.tagger, output, -1)
+        """Saves the compact model, or a pickle if model_path ends in .pkl"""
+        if self.engine == "perceptron":
+            self.tagger.save(self.model_path)
+        elif self.model_path.endswith(".pkl"):
+            with open(self.model_path, 'wb') as output:
+                dump(self.tagger, output, -1)
+        else:
+            save_compact_tagger(self.tagger, self.model_path)
 
     def tag(self, sent):
-        return self.tagger.tag(sent)
+        if self.cache.maxsize == 0:
+            return self.tagger.tag(sent)
+        key = tuple(sent)
+        tagged = self.cache.get(key)
+        if tagged is None:
+            tagged = self.tagger.tag(sent)
+            self.cache.put(key, tagged)
+        return list(tagged)
 
     def tag_sentence(self, sent):
         """Take a sentence as a string and return a list of (word, tag) tuples."""
-        tokens = nltk.word_tokenize(sent)
+        from nltk import word_tokenize
+        tokens = word_tokenize(sent)
         return self.tag(tokens)
 
+    def tag_many(self, sentences, n_jobs=1, chunksize=None):
+        """Tags a batch of sentences, strings or lists of tokens, returns a
+        list of (word, tag) lists in the same order.
+        Repeated sentences are only tagged once. With n_jobs > 1 (or None
+        for all cores) large batches are tokenized and tagged in a pool of
+        processes, each loading the model once, in chunks of chunksize
+        sentences.
+        """
+        keys = [s if isinstance(s, str) else tuple(s) for s in sentences]
+        unique = list(dict.fromkeys(keys))
+        n_jobs = n_jobs if n_jobs and n_jobs > 0 else cpu_count() or 1
+        if n_jobs > 1 and len(unique) >= PARALLEL_MIN_SENTENCES:
+            from concurrent.futures import ProcessPoolExecutor
+            chunksize = chunksize or max(1, len(unique) // (n_jobs * 4))
+            with ProcessPoolExecutor(
+                    n_jobs, initializer=_init_worker,
+                    initargs=(self.model_path, self.cache.maxsize,
+                              self.engine)) as pool:
+                tagged = list(pool.map(_tag_worker, unique,
+                                       chunksize=chunksize))
+        else:
+            tagged = [_tag(self, s) for s in unique]
+        tagged = dict(zip(unique, tagged))
+        return [list(tagged[k]) for k in keys]
+
     def is_passive(self, sent):
         return is_passive(self, sent)
 
+    def find_passive(self, document_or_iterable, batch_size=1000, n_jobs=1):
+        return find_passive(self, document_or_iterable, batch_size, n_jobs)
+
     @staticmethod
     def get_conjuncts(tok):
         """
@@ -80,22 +157,81 @@ class SentenceTagger(object):
         Returns:
             bool
         """
+        from spacy.symbols import NOUN
         if token.doc.is_tagged is False:
             raise ValueError('token is not POS-tagged')
         return True if token.pos == NOUN and token.lemma != token.lower else False
 
     @staticmethod
-    def get_subjects_of_verb(verb):
-        """Return all subjects of a verb according to the dependency parse."""
-        if verb.dep_ == "aux" and list(verb.ancestors):
-            return SentenceTagger.get_subjects_of_verb(list(verb.ancestors)[0])
+    def _own_subjects(verb):
+        """Subjects attached to the verb itself, and their conjuncts."""
         subjs = [tok for tok in verb.lefts if tok.dep_ in SUBJ_DEPS]
         # get additional conjunct subjects
-        subjs.extend(tok for subj in subjs for tok in SentenceTagger.get_conjuncts(subj))
-        if not len(subjs):
-            return SentenceTagger.get_subjects_of_verb(list(verb.ancestors)[0])
+        subjs.extend(tok for subj in subjs
+                     for tok in SentenceTagger.get_conjuncts(subj))
         return subjs
 
+    @staticmethod
+    def _subject_path(verb, resolved=None):
+        """Walks up from verb to the token that holds its subjects (skipping
+        auxiliaries and verbs without subjects), returns the walked tokens
+        and the subjects, [] if the root has none.
+        Tokens already in resolved (index -> subjects) end the walk."""
+        path = []
+        tok = verb
+        while resolved is None or tok.i not in resolved:
+            path.append(tok)
+            is_root = tok.head.i == tok.i
+            if tok.dep_ != "aux" or is_root:
+                subjs = SentenceTagger._own_subjects(tok)
+                if subjs or is_root:
+                    return path, subjs
+            tok = tok.head
+        return path, resolved[tok.i]
+
+    @staticmethod
+    def get_subjects_of_verb(verb):
+        """Return all subjects of a verb according to the dependency parse."""
+        return SentenceTagger._subject_path(verb)[1]
+
+    @staticmethod
+    def verb_index(doc):
+        """
+        Subjects, person and number of every verb of a parsed doc, in a
+        single pass: each token's subjects are resolved once and shared by
+        the tokens below it.
+        Returns:
+            dict: token index -> (subjects, person, number)
+        """
+        from spacy.symbols import NOUN
+        if doc.is_tagged is False:
+            raise ValueError('doc is not POS-tagged')
+        resolved = {}
+        for token in doc:
+            path, subjs = SentenceTagger._subject_path(token, resolved)
+            for tok in path:
+                resolved[tok.i] = subjs
+
+        index = {}
+        for token in doc:
+            if not token.tag_.startswith('VB'):
+                continue
+            subjs = resolved[token.i]
+            texts = set(x.text for x in subjs)
+            if texts & {'I', 'we', 'We'}:
+                person = 1
+            elif texts & {'you', 'You'}:
+                person = 2
+            else:
+                person = 3
+            plural = sum(x.pos == NOUN and x.lemma != x.lower for x in subjs)
+            if subjs and plural / len(subjs) > .5:
+                number = PLURAL
+            else:
+                number = SINGULAR
+            index[token.i] = (subjs, person, number)
+        return index
+
     @staticmethod
     def is_plural_verb(token):
         if token.doc.is_tagged is False:
@@ -124,10 +260,26 @@ class SentenceTagger(object):
             str: changed text.
         """
         nlp = nlp or self.nlp
-        tense_lookup = {'future': 'inf', 'present': PRESENT, 'past': PAST}
-        tense = tense_lookup[to_tense]
+        return self._change_tense_doc(nlp(text), to_tense)
+
+    def change_tense_stream(self, texts, to_tense, nlp=None, batch_size=1000,
+                            n_process=1):
+        """Lazily change the tense of every text of an iterable, parsed in
+        batches with nlp.pipe."""
+        nlp = nlp or self.nlp
+        for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+            yield self._change_tense_doc(doc, to_tense)
 
-        doc = nlp(text)
+    def change_tense_many(self, texts, to_tense, nlp=None, batch_size=1000,
+                          n_process=1):
+        """Change the tense of a list of texts, see change_tense_stream."""
+        return list(self.change_tense_stream(texts, to_tense, nlp,
+                                             batch_size, n_process))
+
+    def _change_tense_doc(self, doc, to_tense):
+        tense_lookup = {'future': INFINITIVE, 'present': PRESENT, 'past': PAST}
+        tense = tense_lookup[to_tense]
+        index = self.verb_index(doc)
 
         out = list()
         out.append(doc[0].text)
@@ -149,19 +301,7 @@ class SentenceTagger(object):
                 else:
                     this_tense = tense
 
-                subjects = [x.text for x in self.get_subjects_of_verb(words[
-                                                                          -1])]
-                if ('I' in subjects) or ('we' in subjects) or (
-                        'We' in subjects):
-                    person = 1
-                elif ('you' in subjects) or ('You' in subjects):
-                    person = 2
-                else:
-                    person = 3
-                if self.is_plural_verb(words[-1]):
-                    number = PLURAL
-                else:
-                    number = SINGULAR
+                _, person, number = index[words[-1].i]
                 if (words[-2].text == 'will' and words[-2].tag_ == 'MD') or \
                         words[
                             -2].text == 'had':
@@ -174,8 +314,7 @@ class SentenceTagger(object):
                         out.append('will')
                 # if word_pair[0].dep_ == 'auxpass':
                 out.append(
-                    conjugate(words[-1].text, tense=this_tense, person=person,
-                              number=number))
+                    conjugate(words[-1].text, this_tense, person, number))
             else:
                 out.append(words[-1].text)
 
@@ -190,43 +329,103 @@ class SentenceTagger(object):
                     out.pop(-2)
 
             # future perfect, and progressives, but ignore for "I will have cookies"
-            if words[-1].text in ('have', 'has') and len(
-                    list(words[-1].ancestors)) and words[-1].dep_ == 'aux':
+            if words[-1].text in ('have', 'has') and \
+                    words[-1].head.i != words[-1].i and words[-1].dep_ == 'aux':
                 out.pop(-1)
 
         text_out = ' '.join(out)
-
-        for char in string.punctuation:
-            if char in """(<['""":
-                text_out = text_out.replace(char + ' ', char)
-            else:
-                text_out = text_out.replace(' ' + char, char)
+        text_out = _PUNCTUATION_SPACES.sub(r"\1\2", text_out)
 
         text_out = text_out.replace(" 's", "'s")  # fix posessive 's
 
         return text_out
 
 
+# No space before punctuation, except after opening ones (<[' in one pass.
+_OPENING = """(<['"""
+_PUNCTUATION_SPACES = re.compile(" ([{0}])|([{1}]) ".format(
+    re.escape("".join(c for c in string.punctuation if c not in _OPENING)),
+    re.escape(_OPENING)))
+
+
+# Class of each tag for _passivep, filled as new tags are seen. Taggers
+# return the strings of their tag table so there are only a few dozen keys.
+_OTHER, _BE, _VERB = 0, 1, 2
+_TAG_CLASSES = {}
+
+
+def _tag_class(tag):
+    if tag.startswith("BE"):
+        return _BE
+    if tag.startswith("V") and not tag.startswith("VBG"):
+        return _VERB
+    return _OTHER
+
+
 def _passivep(tags):
     """Takes a list of tags, returns true if we think this is a passive
     sentence.
     Particularly, if we see a "BE" verb followed by some other, non-BE
     verb, except for a gerund, we deem the sentence to be passive.
     """
+    seen_be = False
+    for tag in tags:
+        kind = _TAG_CLASSES.get(tag)
+        if kind is None:
+            kind = _TAG_CLASSES[tag] = _tag_class(tag)
+        if kind == _BE:
+            seen_be = True
+        elif kind == _VERB and seen_be:
+            return True
+    return False
+
+
+def _tag(tagger, sent):
+    if isinstance(sent, str):
+        return tagger.tag_sentence(sent)
+    return tagger.tag(sent)
+
+
+# Each worker of a tag_many pool loads its own tagger once, unless it was
+# forked from a parent that already holds the shared one.
+_worker_tagger = None
+
 
-    after_to_be = list(dropwhile(lambda tag: not tag.startswith("BE"), tags))
-    nongerund = lambda tag: tag.startswith("V") and not tag.startswith("VBG")
+def _init_worker(model_path, cache_size, engine):
+    global _worker_tagger
+    if model_path == ENGINES[engine] and models.is_loaded("tagger", engine):
+        _worker_tagger = models.get("tagger", engine)
+    else:
+        _worker_tagger = SentenceTagger(model_path, cache_size=cache_size,
+                                        engine=engine)
 
-    filtered = filter(nongerund, after_to_be)
-    out = any(filtered)
 
-    return out
+def _tag_worker(sent):
+    return _tag(_worker_tagger, sent)
 
 
 def is_passive(tagger, sent):
     tagged = tagger.tag_sentence(sent)
-    tags = map(lambda tup: tup[1], tagged)
-    return bool(_passivep(tags))
+    return _passivep(tag for _, tag in tagged)
+
+
+def find_passive(tagger, document_or_iterable, batch_size=1000, n_jobs=1):
+    """Lazily yields (sentence, start, end) for every passive sentence of a
+    string or of an iterable of strings, such as an open file, start and
+    end being character offsets in the whole input.
+    Sentences are segmented as they are read and tagged batch_size at a
+    time with tag_many, so memory stays bounded on inputs of any size."""
+    from TexTor.extract.segmentation import stream_sentences
+    sentences = stream_sentences(document_or_iterable)
+    while True:
+        batch = list(islice(sentences, batch_size))
+        if not batch:
+            return
+        tagged = tagger.tag_many([words for _, _, _, words in batch],
+                                 n_jobs=n_jobs)
+        for (sentence, start, end, _), tags in zip(batch, tagged):
+            if _passivep(tag for _, tag in tags):
+                yield sentence, start, end
 
 
 if __name__ == '__main__':
@@ -237,6 +436,11 @@ if __name__ == '__main__':
 
     assert t.is_passive('Mistakes were made.')
     assert not t.is_passive('I made mistakes.')
+    document = 'I made mistakes. Mistakes were made.'
+    assert list(t.find_passive(document)) == [('Mistakes were made.', 17, 36)]
+    assert t.tag_many(['Mistakes were made.', ['I', 'made', 'mistakes']]) == \
+        [t.tag_sentence('Mistakes were made.'),
+         t.tag(['I', 'made', 'mistakes'])]
     # Notable fail case. Fix me. I think it is because the 'to be' verb is
     # omitted.
     # assert t.is_passive('guy shot by police')
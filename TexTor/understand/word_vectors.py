@@ -2,24 +2,37 @@ from functools import lru_cache
 import math
 from typing import Iterable, List
 
-from gensim.parsing.preprocessing import STOPWORDS
-from gensim.parsing.porter import PorterStemmer
-from gensim.models import Word2Vec
-from gensim.utils import simple_preprocess
-
 import numpy as np
 
-stemmer = PorterStemmer()
+# gensim is slow to import, it is only imported on first use
+_stemmer = None
+
+
+def get_stemmer():
+    global _stemmer
+    if _stemmer is None:
+        from gensim.parsing.porter import PorterStemmer
+        _stemmer = PorterStemmer()
+    return _stemmer
+
+
+def __getattr__(name: str):
+    """lazy module attributes, `stemmer` is created on first access"""
+    if name == "stemmer":
+        return get_stemmer()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 @lru_cache(maxsize=1024)
 def stem(word: str) -> str:
     """stemming words is not cheap, so use a cache decorator"""
-    return stemmer.stem(word)
+    return get_stemmer().stem(word)
 
 
 def tokenizer(sentence: str) -> List[str]:
     """use gensim's `simple_preprocess` and `STOPWORDS` list"""
+    from gensim.parsing.preprocessing import STOPWORDS
+    from gensim.utils import simple_preprocess
     return [stem(token) for token in simple_preprocess(sentence) if token not in STOPWORDS]
 
 
@@ -40,6 +53,7 @@ class WordTwoVec(object):
     a wrapper for gensim.Word2Vec with added functionality to embed phrases
     """
     def __init__(self, model_file: str) -> None:
+        from gensim.models import Word2Vec
         if model_file.endswith(".bin"):
             self.model = Word2Vec.load_word2vec_format(model_file, binary=True)
         else:
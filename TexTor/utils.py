@@ -1,12 +1,123 @@
+from itertools import groupby
+from operator import itemgetter
 from TexTor import get_nlp
-from TexTor.understand.coreference import replace_coreferences
+from TexTor.understand.coreference import replace_coreferences, \
+    replace_coreferences_stream
 from TexTor.understand.inflect import singularize as make_singular
-from spacy.parts_of_speech import NOUN
 
+ARTICLES = {"the", "a", "an"}
 
-def singularize(text, nlp=None):
-    nlp = nlp or get_nlp()
-    doc = nlp(text)
+# Expand common contractions, e.g. "isn't" -> "is not"
+# NOTE: words are lower cased before lookup, so capitalized entries
+# such as "I'm" are kept for reference but never matched
+CONTRACTIONS = {
+    "ain't": "is not",
+    "aren't": "are not",
+    "can't": "can not",
+    "could've": "could have",
+    "couldn't": "could not",
+    "didn't": "did not",
+    "doesn't": "does not",
+    "don't": "do not",
+    "gonna": "going to",
+    "gotta": "got to",
+    "hadn't": "had not",
+    "hasn't": "has not",
+    "haven't": "have not",
+    "he'd": "he would",
+    "he'll": "he will",
+    "he's": "he is",
+    "how'd": "how did",
+    "how'll": "how will",
+    "how's": "how is",
+    "I'd": "I would",
+    "I'll": "I will",
+    "I'm": "I am",
+    "I've": "I have",
+    "isn't": "is not",
+    "it'd": "it would",
+    "it'll": "it will",
+    "it's": "it is",
+    "mightn't": "might not",
+    "might've": "might have",
+    "mustn't": "must not",
+    "must've": "must have",
+    "needn't": "need not",
+    "oughtn't": "ought not",
+    "shan't": "shall not",
+    "she'd": "she would",
+    "she'll": "she will",
+    "she's": "she is",
+    "shouldn't": "should not",
+    "should've": "should have",
+    "somebody's": "somebody is",
+    "someone'd": "someone would",
+    "someone'll": "someone will",
+    "someone's": "someone is",
+    "that'll": "that will",
+    "that's": "that is",
+    "that'd": "that would",
+    "there'd": "there would",
+    "there're": "there are",
+    "there's": "there is",
+    "they'd": "they would",
+    "they'll": "they will",
+    "they're": "they are",
+    "they've": "they have",
+    "wasn't": "was not",
+    "we'd": "we would",
+    "we'll": "we will",
+    "we're": "we are",
+    "we've": "we have",
+    "weren't": "were not",
+    "what'd": "what did",
+    "what'll": "what will",
+    "what're": "what are",
+    "what's": "what is",
+    "whats": "what is",  # technically incorrect but some STT outputs
+    "what've": "what have",
+    "when's": "when is",
+    "when'd": "when did",
+    "where'd": "where did",
+    "where's": "where is",
+    "where've": "where have",
+    "who'd": "who would",
+    "who'd've": "who would have",
+    "who'll": "who will",
+    "who're": "who are",
+    "who's": "who is",
+    "who've": "who have",
+    "why'd": "why did",
+    "why're": "why are",
+    "why's": "why is",
+    "won't": "will not",
+    "won't've": "will not have",
+    "would've": "would have",
+    "wouldn't": "would not",
+    "wouldn't've": "would not have",
+    "y'all": "you all",
+    "ya'll": "you all",
+    "you'd": "you would",
+    "you'd've": "you would have",
+    "you'll": "you will",
+    "y'aint": "you are not",
+    "y'ain't": "you are not",
+    "you're": "you are",
+    "you've": "you have",
+}
+
+
+# components not needed to find nouns
+SINGULARIZE_DISABLE = ("parser", "ner", "lemmatizer", "neuralcoref")
+
+
+def _disabled_pipes(nlp, disable=SINGULARIZE_DISABLE):
+    return [name for name in nlp.pipe_names if name in disable]
+
+
+def singularize_doc(doc):
+    """ singularize the nouns of an already parsed spacy doc """
+    from spacy.parts_of_speech import NOUN
     ignores = ["this", "data", "my", "was"]
     replaces = {"are": "is"}
     words = []
@@ -20,76 +131,142 @@ def singularize(text, nlp=None):
     return " ".join(words)
 
 
+def singularize(text, nlp=None):
+    nlp = nlp or get_nlp()
+    doc = next(iter(nlp.pipe([text], disable=_disabled_pipes(nlp))))
+    return singularize_doc(doc)
+
+
+def singularize_many(texts, nlp=None, batch_size=1000):
+    """ singularize a list of texts, parsing them in batches with nlp.pipe """
+    nlp = nlp or get_nlp()
+    docs = nlp.pipe(texts, batch_size=batch_size,
+                    disable=_disabled_pipes(nlp))
+    return [singularize_doc(doc) for doc in docs]
+
+
+def _split_words(text, remove_articles=False):
+    words = str(text).split()  # this also removed extra spaces
+    if remove_articles:
+        words = [word for word in words if word not in ARTICLES]
+    return words
+
+
 def normalize(text, remove_articles=False, solve_corefs=False,
-              make_singular=False, coref_nlp=None, nlp=None):
-    text = str(text)
-    words = text.split()  # this also removed extra spaces
-    normalized = ""
-
-    for word in words:
-        if remove_articles and word in ["the", "a", "an"]:
-            continue
-
-        # Expand common contractions, e.g. "isn't" -> "is not"
-        contraction = ["ain't", "aren't", "can't", "could've", "couldn't",
-                       "didn't", "doesn't", "don't", "gonna", "gotta",
-                       "hadn't", "hasn't", "haven't", "he'd", "he'll", "he's",
-                       "how'd", "how'll", "how's", "I'd", "I'll", "I'm",
-                       "I've", "isn't", "it'd", "it'll", "it's", "mightn't",
-                       "might've", "mustn't", "must've", "needn't",
-                       "oughtn't",
-                       "shan't", "she'd", "she'll", "she's", "shouldn't",
-                       "should've", "somebody's", "someone'd", "someone'll",
-                       "someone's", "that'll", "that's", "that'd", "there'd",
-                       "there're", "there's", "they'd", "they'll", "they're",
-                       "they've", "wasn't", "we'd", "we'll", "we're", "we've",
-                       "weren't", "what'd", "what'll", "what're", "what's",
-                       "whats",  # technically incorrect but some STT outputs
-                       "what've", "when's", "when'd", "where'd", "where's",
-                       "where've", "who'd", "who'd've", "who'll", "who're",
-                       "who's", "who've", "why'd", "why're", "why's", "won't",
-                       "won't've", "would've", "wouldn't", "wouldn't've",
-                       "y'all", "ya'll", "you'd", "you'd've", "you'll",
-                       "y'aint", "y'ain't", "you're", "you've"]
-        if word.lower() in contraction:
-            expansion = ["is not", "are not", "can not", "could have",
-                         "could not", "did not", "does not", "do not",
-                         "going to", "got to", "had not", "has not",
-                         "have not", "he would", "he will", "he is",
-                         "how did",
-                         "how will", "how is", "I would", "I will", "I am",
-                         "I have", "is not", "it would", "it will", "it is",
-                         "might not", "might have", "must not", "must have",
-                         "need not", "ought not", "shall not", "she would",
-                         "she will", "she is", "should not", "should have",
-                         "somebody is", "someone would", "someone will",
-                         "someone is", "that will", "that is", "that would",
-                         "there would", "there are", "there is", "they would",
-                         "they will", "they are", "they have", "was not",
-                         "we would", "we will", "we are", "we have",
-                         "were not", "what did", "what will", "what are",
-                         "what is",
-                         "what is", "what have", "when is", "when did",
-                         "where did", "where is", "where have", "who would",
-                         "who would have", "who will", "who are", "who is",
-                         "who have", "why did", "why are", "why is",
-                         "will not", "will not have", "would have",
-                         "would not", "would not have", "you all", "you all",
-                         "you would", "you would have", "you will",
-                         "you are not", "you are not", "you are", "you have"]
-            word = expansion[contraction.index(word.lower())]
+              make_singular=False, coref_nlp=None, nlp=None, parse_once=False):
+    """ normalize text
+
+    Args:
+        text (str): text to normalize
+        remove_articles (bool): remove "the", "a" and "an"
+        solve_corefs (bool): replace coreferences
+        make_singular (bool): singularize nouns
+        coref_nlp: coreference model, loaded if not provided
+        nlp: spacy model, loaded if not provided
+        parse_once (bool): when singularizing, parse the whole text once
+            instead of parsing every word on its own, nouns are tagged in
+            context so the output matches singularize(text)
+    Returns:
+        str: normalized text
+    """
+    words = _split_words(text, remove_articles)
 
+    if make_singular and not parse_once:
+        nlp = nlp or get_nlp()
+        normalized = " ".join(
+            singularize(CONTRACTIONS.get(word.lower(), word), nlp=nlp)
+            for word in words)
+    else:
+        normalized = " ".join([CONTRACTIONS.get(word.lower(), word)
+                               for word in words])
         if make_singular:
-            nlp = nlp or get_nlp()
-            word = singularize(word, nlp=nlp)
-        normalized += " " + word
+            normalized = singularize(normalized, nlp=nlp)
 
     if solve_corefs:
-        normalized = replace_coreferences(normalized[1:], coref_nlp)
+        normalized = replace_coreferences(normalized, coref_nlp)
 
     return normalized.strip()
 
 
+def _singularize_words_stream(word_lists, nlp, batch_size=1000,
+                               n_process=1):
+    """ singularize every word on its own, like normalize does, but parse
+    the words of all texts in shared nlp.pipe batches """
+
+    def words():
+        for idx, words in enumerate(word_lists):
+            # empty texts still need a doc to be yielded in order
+            for word in words or [""]:
+                yield word, idx
+
+    docs = nlp.pipe(words(), as_tuples=True, batch_size=batch_size,
+                    n_process=n_process, disable=_disabled_pipes(nlp))
+    for _, group in groupby(docs, key=itemgetter(1)):
+        yield " ".join(singularize_doc(doc) for doc, _ in group)
+
+
+def normalize_stream(texts, remove_articles=False, solve_corefs=False,
+                     make_singular=False, coref_nlp=None, nlp=None,
+                     parse_once=False, batch_size=1000, n_process=1):
+    """ normalize an iterable of texts, yielding normalized texts in order
+
+    texts can be any iterable, a list, a file object or another generator,
+    it is consumed lazily so memory does not grow with the input size
+
+    Args:
+        texts (iterable): texts to normalize
+        remove_articles (bool): remove "the", "a" and "an"
+        solve_corefs (bool): replace coreferences
+        make_singular (bool): singularize nouns
+        coref_nlp: coreference model, loaded if not provided
+        nlp: spacy model, loaded if not provided
+        parse_once (bool): parse every text once when singularizing,
+            see normalize
+        batch_size (int): number of texts (or words) per nlp.pipe batch
+        n_process (int): number of processes used by nlp.pipe when
+            singularizing, coreference resolution always runs in process
+    Yields:
+        str: normalized text
+    """
+    words = (_split_words(text, remove_articles) for text in texts)
+    if make_singular and not parse_once:
+        nlp = nlp or get_nlp()
+        normalized = _singularize_words_stream(
+            ([CONTRACTIONS.get(word.lower(), word) for word in text_words]
+             for text_words in words),
+            nlp, batch_size=batch_size, n_process=n_process)
+    else:
+        normalized = (" ".join([CONTRACTIONS.get(word.lower(), word)
+                                for word in text_words])
+                      for text_words in words)
+        if make_singular:
+            nlp = nlp or get_nlp()
+            docs = nlp.pipe(normalized, batch_size=batch_size,
+                            n_process=n_process,
+                            disable=_disabled_pipes(nlp))
+            normalized = (singularize_doc(doc) for doc in docs)
+
+    if solve_corefs:
+        normalized = replace_coreferences_stream(normalized, coref_nlp,
+                                                 batch_size=batch_size)
+
+    for text in normalized:
+        yield text.strip()
+
+
+def normalize_many(texts, remove_articles=False, solve_corefs=False,
+                   make_singular=False, coref_nlp=None, nlp=None,
+                   parse_once=False, batch_size=1000, n_process=1):
+    """ normalize a list of texts, models are only resolved once and spacy
+    work is done in batches, see normalize_stream """
+    return list(normalize_stream(texts, remove_articles=remove_articles,
+                                 solve_corefs=solve_corefs,
+                                 make_singular=make_singular,
+                                 coref_nlp=coref_nlp, nlp=nlp,
+                                 parse_once=parse_once,
+                                 batch_size=batch_size, n_process=n_process))
+
+
 if __name__ == "__main__":
     sentence = "What's    the weather     like?"
     print(normalize(sentence))
@@ -98,6 +275,14 @@ if __name__ == "__main__":
 
     sentence = "My sister loves dogs."
     assert normalize(sentence, make_singular=True) == "My sister love dog."
+    assert normalize(sentence, make_singular=True, parse_once=True) == \
+           singularize(sentence)
+
+    assert normalize_many(["What's    the weather     like?",
+                           "I can't   say"]) == ["what is the weather like?",
+                                                 "I can not say"]
+    assert list(normalize_stream(iter(["What's up", "I can't"]))) == \
+           ["what is up", "I can not"]
 
     sentence = "My sister has a dog. She loves him."
 
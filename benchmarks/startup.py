@@ -0,0 +1,226 @@
+"""Cold start benchmark for TexTor's entry points.
+
+Every stage runs in a fresh python process, so each measurement includes
+the imports and model loading a new worker would pay for. Wall time and
+peak RSS are reported for each stage as JSON.
+
+Models that are not installed are replaced by stand-ins (a blank spacy
+pipeline, a tiny tagger, a synthetic WordNet-Affect), the stage is then
+flagged with "stand_in": true. Stages whose dependencies are missing are
+reported as "skipped".
+
+    python benchmarks/startup.py --repeat 5 --output startup.json
+    python benchmarks/startup.py --baseline startup.json  # compare
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from os.path import abspath, dirname, exists, join
+from statistics import median
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+#### STAGES ##############################################################
+# Each stage returns True if it had to use a stand-in model.
+
+def import_textor():
+    import TexTor
+    return False
+
+
+def import_modules():
+    import TexTor.utils
+    import TexTor.understand.inflect
+    import TexTor.understand.tagging
+    import TexTor.understand.coreference
+    import TexTor.extract.ner
+    import TexTor.extract.summarize
+    import TexTor.lexicons.word_analysis
+    return False
+
+
+def get_nlp():
+    from TexTor import get_nlp
+    try:
+        get_nlp()
+        return False
+    except OSError:  # model not downloaded
+        import spacy
+        spacy.blank("en")
+        return True
+
+
+def get_corefnlp():
+    from TexTor import get_corefnlp
+    try:
+        get_corefnlp()
+        return False
+    except (ImportError, OSError):  # sense2vec or model not installed
+        import spacy
+        spacy.blank("en")
+        return True
+
+
+def sentence_tagger():
+    from TexTor.settings import TAGGER_PATH
+    from TexTor.understand.tagging import SentenceTagger
+    if exists(TAGGER_PATH):
+        SentenceTagger()
+        return False
+    # a tiny tagger instead of training on the brown corpus
+    import nltk
+    from TexTor.understand.ngram_tagger import save_compact_tagger
+    path = join(tempfile.mkdtemp(), "tagger.bin")
+    save_compact_tagger(
+        nltk.UnigramTagger([[("I", "PPSS"), ("made", "VBD")]]), path)
+    SentenceTagger(model_path=path)
+    return True
+
+
+def lexicon():
+    from TexTor.lexicons import LEXICON
+    return False
+
+
+def inflection_table():
+    from TexTor.understand.inflect import get_inflection_table, pluralize
+    stand_in = get_inflection_table() is None
+    pluralize("dog")
+    return stand_in
+
+
+def wnaffect():
+    from TexTor.lexicons import wnaffect
+    here = dirname(wnaffect.__file__)
+    if exists(join(here, "wordnet-1.6")) and exists(join(here, "wn-domains-3.2")):
+        wnaffect.WNAffect()
+        return False
+    # synthetic hierarchy and synsets with the layout of WordNet-Affect 1.1,
+    # only the xml parsing is measured
+    data = join(tempfile.mkdtemp(), "wn-affect-1.1")
+    os.makedirs(data)
+    categs = ['<categ name="root"/>'] + [
+        '<categ name="emotion{0}" isa="{1}"/>'.format(
+            i, i and "emotion{0}".format(i // 4) or "root")
+        for i in range(300)]
+    with open(join(data, "a-hierarchy.xml"), "w") as f:
+        f.write("<syn-list>{0}</syn-list>".format("".join(categs)))
+    synsets = []
+    for pos in ("noun", "adj", "verb", "adv"):
+        synsets.append("<{0}-syn-list>{1}</{0}-syn-list>".format(pos, "".join(
+            '<{0}-syn id="{1}#{2}" categ="emotion{3}"/>'.format(
+                pos, pos[0], i + 1, i % 300) for i in range(1000))))
+    with open(join(data, "a-synsets.xml"), "w") as f:
+        f.write("<syn-list>{0}</syn-list>".format("".join(synsets)))
+    affect = wnaffect.WNAffect.__new__(wnaffect.WNAffect)
+    affect._load_emotions(dirname(data))
+    affect._load_synsets(dirname(data))
+    return True
+
+
+STAGES = OrderedDict((f.__name__, f) for f in (
+    import_textor, import_modules, get_nlp, get_corefnlp, sentence_tagger,
+    lexicon, inflection_table, wnaffect))
+
+
+#### RUNNER ##############################################################
+
+def run_stage(name):
+    """Runs a stage in this process, only meant for a fresh child."""
+    result = {"rss_before_kb": _peak_rss_kb()}
+    start = time.perf_counter()
+    try:
+        result["stand_in"] = STAGES[name]()
+        result["status"] = "ok"
+    except ImportError as e:
+        result["status"] = "skipped"
+        result["reason"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss_kb"] = _peak_rss_kb()
+    return result
+
+
+def measure(name, repeat=3):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, abspath(__file__),
+                              "--child", name],
+                             cwd=ROOT, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+        if out.returncode != 0:
+            return {"status": "error",
+                    "reason": out.stderr.strip().splitlines()[-1:]}
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    result = {"status": runs[0]["status"]}
+    if result["status"] == "skipped":
+        result["reason"] = runs[0]["reason"]
+        return result
+    seconds = [r["seconds"] for r in runs]
+    result.update({"stand_in": runs[0]["stand_in"],
+                   "seconds": seconds,
+                   "seconds_median": median(seconds),
+                   "peak_rss_kb": max(r["peak_rss_kb"] for r in runs),
+                   "rss_delta_kb": max(r["peak_rss_kb"] - r["rss_before_kb"]
+                                       for r in runs)})
+    return result
+
+
+def benchmark(stages=None, repeat=3):
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "stages": OrderedDict((name, measure(name, repeat))
+                                  for name in stages or STAGES)}
+
+
+def compare(report, baseline):
+    """Prints the change of median time and peak RSS against a baseline."""
+    for name, stage in report["stages"].items():
+        old = baseline["stages"].get(name, {})
+        if stage.get("status") != "ok" or old.get("status") != "ok":
+            continue
+        print("{0:20} time {1:+7.1%}  rss {2:+7.1%}".format(
+            name,
+            stage["seconds_median"] / old["seconds_median"] - 1,
+            stage["peak_rss_kb"] / old["peak_rss_kb"] - 1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stage", action="append", choices=list(STAGES),
+                        help="stage to run, all by default")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare with")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(run_stage(args.child)))
+        sys.exit()
+
+    report = benchmark(args.stage, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
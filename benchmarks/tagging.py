@@ -0,0 +1,258 @@
+"""Throughput and latency benchmark for SentenceTagger.
+
+Sentences are grouped in length buckets and each operation is run one
+sentence at a time (latency percentiles) and, where TexTor has a batch API,
+on a whole bucket at once (tag_many, find_passive, change_tense_many).
+Tokens per second are reported for both modes, together with the time it
+took to load the tagger, as JSON.
+
+The corpus is a slice of the Brown corpus or a synthetic corpus generated
+from a fixed seed, so reports of different commits can be compared.
+Operations whose models or data are not installed are reported as
+"skipped".
+
+    python benchmarks/tagging.py --output tagging.json
+    python benchmarks/tagging.py --corpus brown --start 5000 --sentences 2000
+    python benchmarks/tagging.py --baseline tagging.json  # compare
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from collections import OrderedDict
+from os.path import abspath, dirname
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+# (name, shortest, longest) in tokens
+BUCKETS = (("1-10", 1, 10), ("11-20", 11, 20), ("21-40", 21, 40),
+           ("41+", 41, None))
+WARMUP = 20
+
+
+#### CORPUS ##############################################################
+
+_SUBJECTS = ["I", "we", "they", "she", "the committee", "my brother",
+             "the old man", "a few students", "the city council", "John"]
+_OBJECTS = ["the report", "a letter", "mistakes", "the new bridge",
+            "their homework", "a small house", "the budget", "dinner",
+            "several questions", "the results"]
+_VERBS = [("write", "wrote", "written"), ("make", "made", "made"),
+          ("build", "built", "built"), ("approve", "approved", "approved"),
+          ("read", "read", "read"), ("cook", "cooked", "cooked"),
+          ("answer", "answered", "answered"), ("see", "saw", "seen")]
+_ADVERBIALS = ["yesterday", "in the morning", "after the meeting",
+               "with great care", "for the first time", "at home",
+               "without any help", "before the end of the year"]
+_CONNECTIVES = ["and", "but", "because", "while", "although"]
+
+
+def _clause(rng):
+    subject, obj = rng.choice(_SUBJECTS), rng.choice(_OBJECTS)
+    verb = rng.choice(_VERBS)
+    if rng.random() < .3:  # passive
+        words = [obj, rng.choice(["was", "were"]), verb[2], "by", subject]
+    else:
+        words = [subject, verb[1], obj]
+    for _ in range(rng.randint(0, 2)):
+        words.append(rng.choice(_ADVERBIALS))
+    return " ".join(words).split()
+
+
+def synthetic_corpus(n, seed=0):
+    """n tokenized sentences of 3 to about 60 tokens."""
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(n):
+        tokens = _clause(rng)
+        for _ in range(rng.choice([0, 0, 1, 1, 2, 3, 5])):
+            tokens += [rng.choice(_CONNECTIVES)] + _clause(rng)
+        tokens[0] = tokens[0][0].upper() + tokens[0][1:]
+        sentences.append(tokens + ["."])
+    return sentences
+
+
+def brown_corpus(n, start=0):
+    from nltk.corpus import brown
+    return [list(s) for s in brown.sents()[start:start + n]]
+
+
+def bucketed(sentences):
+    """OrderedDict of bucket name -> the sentences of that length."""
+    buckets = OrderedDict((name, []) for name, _, _ in BUCKETS)
+    for tokens in sentences:
+        for name, low, high in BUCKETS:
+            if len(tokens) >= low and (high is None or len(tokens) <= high):
+                buckets[name].append(tokens)
+                break
+    return buckets
+
+
+#### MEASUREMENTS ########################################################
+
+def _percentile(ordered, q):
+    """Nearest rank percentile of a sorted list."""
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure_single(call, buckets, as_text):
+    result = OrderedDict()
+    for name, sentences in buckets.items():
+        if not sentences:
+            continue
+        latencies = []
+        for tokens in sentences:
+            sent = " ".join(tokens) if as_text else tokens
+            start = time.perf_counter()
+            call(sent)
+            latencies.append(time.perf_counter() - start)
+        n_tokens = sum(len(s) for s in sentences)
+        total = sum(latencies)
+        latencies.sort()
+        result[name] = {"sentences": len(sentences),
+                        "tokens": n_tokens,
+                        "seconds": total,
+                        "tokens_per_s": n_tokens / total,
+                        "p50_ms": 1000 * _percentile(latencies, .5),
+                        "p90_ms": 1000 * _percentile(latencies, .9),
+                        "p99_ms": 1000 * _percentile(latencies, .99)}
+    return result
+
+
+def measure_batched(call, buckets, as_text):
+    result = OrderedDict()
+    for name, sentences in buckets.items():
+        if not sentences:
+            continue
+        batch = [" ".join(s) if as_text else s for s in sentences]
+        start = time.perf_counter()
+        call(batch)
+        seconds = time.perf_counter() - start
+        n_tokens = sum(len(s) for s in sentences)
+        result[name] = {"sentences": len(sentences),
+                        "tokens": n_tokens,
+                        "seconds": seconds,
+                        "tokens_per_s": n_tokens / seconds}
+    return result
+
+
+def operations(tagger, n_jobs=1, batch_size=1000):
+    """name -> (single call, batched call or None, takes text)"""
+    return OrderedDict([
+        ("tag", (tagger.tag,
+                 lambda batch: tagger.tag_many(batch, n_jobs=n_jobs), False)),
+        ("tag_sentence", (tagger.tag_sentence,
+                          lambda batch: tagger.tag_many(batch, n_jobs=n_jobs),
+                          True)),
+        ("is_passive", (tagger.is_passive,
+                        lambda batch: list(tagger.find_passive(
+                            (text + "\n" for text in batch), batch_size,
+                            n_jobs)),
+                        True)),
+        ("change_tense", (
+            lambda text: tagger.change_tense(text, "past"),
+            lambda batch: tagger.change_tense_many(batch, "past",
+                                                   batch_size=batch_size),
+            True))])
+
+
+def benchmark(sentences, engine="ngram", model_path=None, ops=None, n_jobs=1,
+              batch_size=1000):
+    sys.path.insert(0, ROOT)
+    from TexTor.understand.tagging import SentenceTagger
+    start = time.perf_counter()
+    tagger = SentenceTagger(model_path=model_path, engine=engine)
+    load_seconds = time.perf_counter() - start
+
+    buckets = bucketed(sentences)
+    results = OrderedDict()
+    for name, (single, batched, as_text) in operations(
+            tagger, n_jobs, batch_size).items():
+        if ops and name not in ops:
+            continue
+        try:
+            for tokens in sentences[:WARMUP]:
+                single(" ".join(tokens) if as_text else tokens)
+        except (ImportError, LookupError, OSError) as e:
+            # missing package, nltk data or spacy model
+            reason = [line for line in str(e).splitlines()
+                      if line.strip(" *")]
+            results[name] = {"status": "skipped", "reason": reason[0]}
+            continue
+        results[name] = {"status": "ok",
+                         "single": measure_single(single, buckets, as_text)}
+        if batched is not None:
+            results[name]["batched"] = measure_batched(batched, buckets,
+                                                       as_text)
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "engine": engine,
+            "sentences": len(sentences),
+            "tokens": sum(len(s) for s in sentences),
+            "n_jobs": n_jobs,
+            "load_seconds": load_seconds,
+            "operations": results}
+
+
+def compare(report, baseline):
+    """Prints the change of throughput and median latency per bucket."""
+    print("load            time {0:+7.1%}".format(
+        report["load_seconds"] / baseline["load_seconds"] - 1))
+    for name, op in report["operations"].items():
+        old = baseline["operations"].get(name, {})
+        if op["status"] != "ok" or old.get("status") != "ok":
+            continue
+        for mode in ("single", "batched"):
+            for bucket, stats in op.get(mode, {}).items():
+                before = old.get(mode, {}).get(bucket)
+                if not before:
+                    continue
+                line = "{0:14} {1:8} {2:6} tokens/s {3:+7.1%}".format(
+                    name, mode, bucket,
+                    stats["tokens_per_s"] / before["tokens_per_s"] - 1)
+                if "p50_ms" in stats:
+                    line += "  p50 {0:+7.1%}".format(
+                        stats["p50_ms"] / before["p50_ms"] - 1)
+                print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", choices=["synthetic", "brown"],
+                        default="synthetic")
+    parser.add_argument("--sentences", type=int, default=1000)
+    parser.add_argument("--start", type=int, default=0,
+                        help="first brown sentence of the slice")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the synthetic corpus")
+    parser.add_argument("--engine", default="ngram")
+    parser.add_argument("--model", help="tagger model path")
+    parser.add_argument("--op", action="append",
+                        choices=["tag", "tag_sentence", "is_passive",
+                                 "change_tense"],
+                        help="operation to run, all by default")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="n_jobs of the batched tag_many")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare with")
+    args = parser.parse_args()
+
+    if args.corpus == "brown":
+        corpus = brown_corpus(args.sentences, args.start)
+    else:
+        corpus = synthetic_corpus(args.sentences, args.seed)
+    report = benchmark(corpus, args.engine, args.model, args.op, args.jobs,
+                       args.batch_size)
+    report["corpus"] = args.corpus
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
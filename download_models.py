@@ -9,4 +9,8 @@ nltk.download('words')
 nltk.download("stopwords")
 nltk.download('brown')
 nltk.download('punkt')
-# TODO spacy + neuralcoref models
\ No newline at end of file
+# TODO spacy + neuralcoref models
+
+# precomputed inflections for the words of the bundled lexicon
+from TexTor.understand.inflect_table import build_inflection_table
+build_inflection_table()
\ No newline at end of file